@@ -0,0 +1,82 @@
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+
+class ActiveSet:
+    # the formulas that are paired with new ones; over the limits formulas are demoted to the passive store,
+    # the oldest one for every `age` demotions of the heaviest ones, and the first `protected` are never demoted
+    def __init__(self, limit: Optional[int] = None, nodes: Optional[int] = None, ratio: Tuple[int, int] = (1, 4)):
+        if limit is None and nodes is None:
+            raise ValueError("The active set needs a limit on formulas or on nodes")
+        if ratio[0] < 0 or ratio[1] < 0 or not any(ratio):
+            raise ValueError(f"Invalid age to weight ratio {ratio}")
+        self.limit_ = limit
+        self.nodes_limit_ = nodes
+        self.ratio_ = ratio
+        self.protected_ = 0
+        self.weights_: Dict[int, int] = {}
+        self.nodes_ = 0
+        self.ages_: List[int] = []
+        self.heavy_: List[Tuple[int, int]] = []
+        self.demoted_ = 0
+
+    def reset(self, protected: int = 0):
+        self.protected_ = protected
+        self.weights_.clear()
+        self.nodes_ = 0
+        self.ages_.clear()
+        self.heavy_.clear()
+        self.demoted_ = 0
+
+    def __len__(self):
+        return len(self.weights_)
+
+    def __contains__(self, idx: int):
+        return idx in self.weights_
+
+    def add(self, idx: int, weight: int):
+        if idx in self.weights_:
+            return
+        self.weights_[idx] = weight
+        self.nodes_ += weight
+        if idx >= self.protected_:
+            heapq.heappush(self.ages_, idx)
+            heapq.heappush(self.heavy_, (-weight, -idx))
+
+    def remove(self, idx: int):
+        self.nodes_ -= self.weights_.pop(idx)
+
+    def over(self) -> bool:
+        return (self.limit_ is not None and len(self.weights_) > self.limit_) or \
+            (self.nodes_limit_ is not None and self.nodes_ > self.nodes_limit_)
+
+    def pop(self, heap: list, key, keep: int) -> Optional[int]:
+        # the heaps are cleaned lazily: an entry of a demoted formula is dropped when it comes up
+        kept = []
+        result = None
+        while heap:
+            entry = heapq.heappop(heap)
+            idx = key(entry)
+            if idx not in self.weights_:
+                continue
+            if idx == keep:
+                kept.append(entry)
+                continue
+            result = idx
+            break
+        for entry in kept:
+            heapq.heappush(heap, entry)
+        return result
+
+    def victim(self, keep: int) -> Optional[int]:
+        age, weight = self.ratio_
+        by_age = weight == 0 or (age and self.demoted_ % (age + weight) < age)
+        heaps = [(self.ages_, lambda entry: entry), (self.heavy_, lambda entry: -entry[1])]
+        if not by_age:
+            heaps.reverse()
+        for heap, key in heaps:
+            idx = self.pop(heap, key, keep)
+            if idx is not None:
+                self.demoted_ += 1
+                return idx
+        return None
@@ -1,21 +1,36 @@
 import time
 import re
-import sys
+import itertools
+import heapq
+import tempfile
 from collections import deque
 from typing import Set
-from enum import Enum, auto
-from constructor import Expression
+from constructor import Expression, Operation
+from modus_ponens import modus_ponens
+from matcher import Matcher, matcher, detach
+from topo_sort import TopoSort
+from kalmar import KalmarSolver, literal
+from bdd import is_tautology, falsify
+from library import LemmaLibrary
+from relevance import PremiseSelector
+from active import ActiveSet
+from codec import encode, decode
+from rules import DerivedRule
+from proof import Proof
+from lemmas import Lemmas, commutation, reorderable
+from checker import STEP
+from compress import compressing
+from stats import SearchStats
+from frontier import SpillingFrontier, Entry
+from skeleton import SkeletonIndex, AVAILABLE as SKELETONS_AVAILABLE
+from goals import GoalIndex, Binding, match
+from contextlib import nullcontext
 INVALID_INDEX = -1
-from typing import List, Dict, Tuple, Union
+from typing import List, Dict, Tuple, Union, Optional, Iterator, Callable, Generator
 
-class Operation(Enum):
-    NOP = auto()
-    NEGATION = auto()
-    IMPLICATION = auto()
-    DISJUNCTION = auto()
-    CONJUNCTION = auto()
-    XOR = auto()
-    EQUIVALENT = auto()
+Stage = Callable[[Iterator[List[Expression]]], Iterator[List[Expression]]]
+# the share of the time limit the search leaves to the Kalmár construction when it can be the fallback
+FALLBACK_SHARE = 0.25
 
 
 def is_equal(left: Expression, right: Expression) -> bool:
@@ -32,6 +47,12 @@ def is_equal(left: Expression, right: Expression) -> bool:
     return left.equals(right)
 
 
+def canonical_form(expression: Expression) -> str:
+    result = Expression(expression)
+    result.canonicalize()
+    return result.to_string()
+
+
 def priority(op: Operation) -> int:
     priorities = {
         Operation.NOP: 0,
@@ -125,71 +146,118 @@ class Node:
 
 
 
-def modus_ponens(a: Expression, b: Expression) -> Expression:
-    if a.empty() or b.empty():
-        return Expression()
-    if b[0].op != Operation.IMPLICATION:
-        return Expression()
-    substitution = {}
-    if not unification(a, b.subtree_copy(b.subtree(0).left()), substitution):
-        return Expression()
-    result = b.subtree_copy(0)
-    result.change_variables(a.max_value() + 1)
-    vars = result.variables()
-    for var in vars:
-        if var not in substitution:
-            continue
-        change = substitution[var]
-        while change[0].type == 'Variable' and change[0].value in substitution:
-            should_negate = change[0].op == Operation.NEGATION
-            change = substitution[change[0].value]
-            if should_negate:
-                change.negation()
-        result.replace(var, change)
-    result = result.subtree_copy(result.subtree(0).right())
-    result.normalize()
-    return result
-
 class Solver:
-    def __init__(self, axioms: list[Expression], target: Expression, time_limit_ms: int):
+    def __init__(self, axioms: list[Expression], target: Expression, time_limit_ms: int,
+                 rules: List[DerivedRule] = (), dump_path: Optional[str] = None,
+                 decompose: bool = True, size_factor: float = 1.0, order: str = 'fifo',
+                 stats: Optional[SearchStats] = None, memory_limit: Optional[int] = None,
+                 lazy: bool = True, filters: List[Stage] = (), batch_size: int = 64,
+                 frontier_limit: Optional[int] = None, skeleton_depth: Optional[int] = 3,
+                 library: Optional[LemmaLibrary] = None, seeds: int = 16, fallback: bool = True,
+                 active_limit: Optional[int] = None, active_nodes: Optional[int] = None,
+                 age_weight_ratio: Tuple[int, int] = (1, 4)):
         self.known_axioms_: Set[str] = set()
-        self.axioms_: List[Expression] = axioms.copy()
-        self.produced_ = deque()
+        # only tautologies follow from tautologies, so with such axioms a falsifiable target is refuted at once
+        self.refutable_ = all(is_tautology(axiom) for axiom in axioms)
+        self.rules_: List[DerivedRule] = list(rules)
+        self.macros_: Dict[str, Tuple[DerivedRule, List[Expression]]] = {}
+        self.base_ = 0
+        self.matchers_: List[Optional[Matcher]] = []
+        # for the lazy frontier: the size of the consequent and the root of the antecedent of every formula
+        self.lazy_ = lazy
+        self.goal_size_ = 0
+        # the saturation is a pipeline of generator stages over batches of formulas, the extra
+        # filters run after the length bound and before deduplication
+        self.filters_: List[Stage] = list(filters)
+        self.batch_size_ = batch_size
+        self.frontier_limit_ = frontier_limit
+        self.deferred_ = deque()
+        self.shapes_: Dict[int, Tuple[int, Optional[Term]]] = {}
+        # the pairs that can not unify are rejected by one array comparison per new formula (needs numpy)
+        self.skeletons_ = SkeletonIndex(skeleton_depth) if skeleton_depth and SKELETONS_AVAILABLE else None
+        # lemmas of earlier proofs seed the first generation and go first in every generation
+        self.library_ = library
+        self.seeds_ = seeds
+        self.fallback_ = fallback
+        # with a limit on the active set the demoted formulas are kept encoded and leave the pairing
+        self.active_ = ActiveSet(active_limit, active_nodes, age_weight_ratio) \
+            if active_limit is not None or active_nodes is not None else None
+        self.passive_: Dict[int, bytes] = {}
+        # the queued pairs and deferred generations that need every formula; a demoted formula that nothing
+        # needs is forgotten, and the same formula may be derived again later
+        self.pending_: Dict[int, int] = {}
+        self.axioms_: List[Optional[Expression]] = axioms.copy()
+        # with a memory limit the formulas waiting for their generation are spilled to disk
+        self.produced_ = deque() if memory_limit is None else SpillingFrontier(memory_limit)
+        # the formulas the library knows are weighed once, when they enter the frontier, and wait in a heap of
+        # (generation, -uses, order, formula) that every generation empties first; lazy pairs are not weighed
+        self.useful_: List[Tuple[int, int, int, Expression]] = []
+        self.lemma_size_ = 0
+        self.generation_ = 0
+        self.order_counter_ = itertools.count()
         self.targets_ = [target]
+        # a formula proves a target once the target is an instance of it, the lookup goes through an index
+        self.goals_ = GoalIndex()
+        # the canonical forms of the targets built from !, > and *, matched up to the order of conjuncts
+        self.reordered_ = GoalIndex()
+        self.reordered_targets_: List[Expression] = []
         self.time_limit_ = time_limit_ms
+        self.decompose_ = decompose
+        self.size_factor_ = size_factor
+        self.order_ = order
         self.ss = ''
-        self.dump_ = open("conclusions.txt", "w")
+        self.proved_ = False
+        self.method_ = ''
+        self.stopped_ = False
+        # the search advanced by step(): the running generator and whether it is over
+        self.steps_: Optional[Iterator[None]] = None
+        self.done_ = False
+        self.stats_ = stats
+        # the derivations of all formulas, read back to extract the proof; without a path every solver
+        # gets a private temporary file, so that solvers in one process do not mix their lines
+        self.dump_path_ = dump_path
+        self.dump_ = tempfile.TemporaryFile("w+") if dump_path is None else open(dump_path, "w+")
 
         if len(self.axioms_) < 3:
             raise ValueError("At least 3 axioms are required")
+        if order not in {'fifo', 'shortest'}:
+            raise ValueError(f"Unknown search order {order}")
+        # the search runs from the Hilbert axioms only, the proofs are checked against them
+        self.axioms_ = self.axioms_[:3]
 
-        self.add_expression(modus_ponens(self.axioms_[0], self.axioms_[0]), 100)
-        self.add_expression(modus_ponens(self.axioms_[1], self.axioms_[0]), 100)
-        self.add_expression(modus_ponens(self.axioms_[3], self.axioms_[1]), 100)
-        self.add_expression(modus_ponens(self.axioms_[4], self.axioms_[1]), 100)
-        self.add_expression(modus_ponens(self.axioms_[2], self.axioms_[5]), 100)
-        self.add_expression(modus_ponens(self.axioms_[6], self.axioms_[6]), 100)
-        self.add_expression(modus_ponens(self.axioms_[7], self.axioms_[8]), 100)
-        self.add_expression(modus_ponens(self.axioms_[3], self.axioms_[9]), 100)
-
-        self.dump_.write(f"{self.axioms_[3]} mp {self.axioms_[0]} {self.axioms_[0]}\n")
-        self.dump_.write(f"{self.axioms_[4]} mp {self.axioms_[1]} {self.axioms_[0]}\n")
-        self.dump_.write(f"{self.axioms_[5]} mp {self.axioms_[3]} {self.axioms_[1]}\n")
-        self.dump_.write(f"{self.axioms_[6]} mp {self.axioms_[4]} {self.axioms_[1]}\n")
-        self.dump_.write(f"{self.axioms_[7]} mp {self.axioms_[2]} {self.axioms_[5]}\n")
-        self.dump_.write(f"{self.axioms_[8]} mp {self.axioms_[6]} {self.axioms_[5]}\n")
-        self.dump_.write(f"{self.axioms_[9]} mp {self.axioms_[7]} {self.axioms_[8]}\n")
-        self.dump_.write(f"{self.axioms_[10]} mp {self.axioms_[3]} {self.axioms_[9]}\n")
+    def phase(self, name: str):
+        return self.stats_.phase(name) if self.stats_ is not None else nullcontext()
 
-        self.axioms_ = self.axioms_[:3]
+    def count(self, name: str):
+        if self.stats_ is not None:
+            self.stats_.count(name)
 
-    def is_target_proved_by(self, expression: Expression) -> bool:
+    def stop(self):
+        # may be called from another thread, the search notices it at the next formula
+        self.stopped_ = True
+        self.time_limit_ = 0
+
+    def proved_target(self, expression: Expression) -> Optional[Tuple[Expression, Optional[Binding]]]:
+        # the target and the substitution that gives it, None for the substitution when the target
+        # only equals an instance up to the order of conjuncts, which commutation() can derive
         if expression.empty():
-            return False
-        for target in self.targets_:
-            if is_equal(target, expression):
-                return True
-        return False
+            return None
+        found = self.goals_.match(expression)
+        if found is not None:
+            return self.goals_.goals_[found[0]], found[1]
+        # without commutative connectives the canonical form is the formula itself
+        if not len(self.reordered_) or len(expression) > self.reordered_.max_size_ or \
+                not any(node.term.type == 'Function' and is_commutative(node.term.op) for node in expression.nodes):
+            return None
+        general = Expression(expression)
+        general.canonicalize()
+        found = self.reordered_.match(general)
+        if found is not None:
+            return self.reordered_targets_[found[0]], None
+        return None
+
+    def is_target_proved_by(self, expression: Expression) -> bool:
+        return self.proved_target(expression) is not None
 
     def deduction_theorem_decomposition(self, expression: Expression) -> bool:
         if expression.empty():
@@ -204,58 +272,406 @@ class Solver:
         if 2 * max_len < len(expression):
             return False
         self.axioms_.append(expression)
-        self.known_axioms_.add(expression.to_string())
+        self.known_axioms_.add(canonical_form(expression))
+        if self.lazy_:
+            self.shapes_[len(self.axioms_) - 1] = self.shape(expression)
+        if self.skeletons_ is not None:
+            self.skeletons_.append(len(self.axioms_) - 1, expression)
+        if self.active_ is not None:
+            self.active_.add(len(self.axioms_) - 1, len(expression))
         return True
 
+    def demote(self, j: int):
+        expression = self.axioms_[j]
+        self.axioms_[j] = None
+        self.active_.remove(j)
+        self.shapes_.pop(j, None)
+        if self.skeletons_ is not None:
+            self.skeletons_.remove(j)
+        if j in self.pending_:
+            self.passive_[j] = encode(expression)
+        else:
+            self.forget(expression)
+        self.count('active.demoted')
+
+    def forget(self, expression: Expression):
+        self.known_axioms_.discard(canonical_form(expression))
+        self.count('active.forgotten')
+
+    def hold(self, j: int):
+        if self.active_ is not None:
+            self.pending_[j] = self.pending_.get(j, 0) + 1
+
+    def release(self, j: int):
+        if self.active_ is None:
+            return
+        refs = self.pending_.pop(j) - 1
+        if refs:
+            self.pending_[j] = refs
+        elif j in self.passive_:
+            self.forget(decode(self.passive_.pop(j)))
+
+    def formula(self, j: int) -> Expression:
+        # a demoted formula needed by a pair comes back to the active set
+        if self.axioms_[j] is None:
+            expression = self.axioms_[j] = decode(self.passive_.pop(j))
+            self.active_.add(j, len(expression))
+            if self.lazy_:
+                self.shapes_[j] = self.shape(expression)
+            if self.skeletons_ is not None:
+                self.skeletons_.append(j, expression)
+            self.count('active.restored')
+        return self.axioms_[j]
+
+    def evict(self):
+        newest = len(self.axioms_) - 1
+        while self.active_.over():
+            victim = self.active_.victim(newest)
+            if victim is None:
+                return
+            self.demote(victim)
+
+    @staticmethod
+    def shape(expression: Expression) -> Tuple[int, Optional[Term]]:
+        if expression.empty() or expression[0].type != 'Function' or expression[0].op != Operation.IMPLICATION:
+            return 0, None
+        rel = expression.subtree(0)
+        return len(expression.subtree_copy(rel.right())), expression[rel.left()]
+
+    def add_pair(self, minor: int, major: int, max_len: int) -> bool:
+        # the conclusion is at least as long as the consequent of the major premise, and the roots
+        # of the minor premise and of the antecedent must agree before unification is worth trying
+        size, antecedent = self.shapes_[major]
+        if antecedent is None:
+            self.count('pairs.not_implication')
+            return False
+        if 2 * max_len < size:
+            self.count('formulas.too_long')
+            return False
+        root = self.formula(minor)[0]
+        if root.type != 'Variable' and antecedent.type != 'Variable' and \
+                (root.type != antecedent.type or root.op != antecedent.op or
+                 (root.type == 'Constant' and root.value != antecedent.value)):
+            self.count('pairs.mismatch')
+            return False
+        self.hold(minor)
+        self.hold(major)
+        # a conclusion that may be as short as a target is computed at once, so that it is checked now
+        if size <= self.goal_size_:
+            expression = self.materialize((minor, major, size), max_len)
+            if expression is None:
+                return False
+            self.enqueue(expression)
+            if self.is_target_proved_by(expression):
+                self.add_expression(expression, max_len)
+                return True
+            return False
+        self.count('pairs.added')
+        self.produced_.append((minor, major, size))
+        return False
+
+    def materialize(self, entry: Entry, max_len: int) -> Optional[Expression]:
+        if isinstance(entry, Expression):
+            return entry
+        minor, major, _ = entry
+        expression = self.detach(self.formula(minor), major)
+        premises = self.axioms_[minor], self.axioms_[major]
+        self.release(minor)
+        self.release(major)
+        if expression.empty():
+            return None
+        if 2 * max_len < len(expression):
+            self.count('formulas.too_long')
+            return None
+        self.dump_.write(f"{expression} mp {premises[0]} {premises[1]}\n")
+        return expression
+
+    @staticmethod
+    def size(entry: Entry) -> int:
+        return len(entry) if isinstance(entry, Expression) else entry[2]
+
     def add_produced(self, expression: Expression, max_len: int) -> bool:
         if expression.empty():
             return False
         if 2 * max_len < len(expression):
+            self.count('formulas.too_long')
             return False
-        self.produced_.append(expression)
+        self.enqueue(expression)
         return True
 
-    def produce(self, max_len: int):
-        if not self.produced_:
-            return
-        iteration_size = len(self.produced_)
-        print(f"iter: {iteration_size}", file=sys.stderr)
-        for _ in range(iteration_size):
-            if time.time() * 1000 > self.time_limit_:
-                break
-            expression = self.produced_.popleft()
-            if 2 * max_len < len(expression):
-                continue
-            expression.normalize()
-            representation = expression.to_string()
-            if representation in self.known_axioms_:
-                continue
-            self.add_expression(expression, max_len)
-            if self.is_target_proved_by(expression):
+    def enqueue(self, expression: Expression):
+        # a library lemma has no more nodes than characters in its key, longer formulas are not looked up
+        if len(expression) <= self.lemma_size_:
+            used = self.library_.used(canonical_form(expression))
+            if used:
+                heapq.heappush(self.useful_, (self.generation_, -used, next(self.order_counter_), expression))
                 return
-            for j in range(len(self.axioms_)):
-                expr = modus_ponens(self.axioms_[j], self.axioms_[-1])
+        self.produced_.append(expression)
+
+    def apply_rules(self, max_len: int) -> Generator[None, None, bool]:
+        # binary rules pair the newest formula with the axioms and hypotheses only,
+        # pairing it with every derived formula makes a generation quadratic again
+        newest = self.axioms_[-1]
+        base = self.axioms_[:min(self.base_, len(self.axioms_) - 1)]
+        for rule in self.rules_:
+            if rule.arity == 1:
+                candidates = [[newest]]
+            else:
+                candidates = [[other, newest] for other in base] + [[newest, other] for other in base]
+            for premises in candidates:
+                yield
+                self.count('rules.applied')
+                expr = rule.apply(premises)
                 if self.add_produced(expr, max_len):
-                    self.dump_.write(f"{expr} mp {self.axioms_[j]} {self.axioms_[-1]}\n")
+                    self.record_macro(rule, premises, expr)
                 if self.is_target_proved_by(expr):
                     self.add_expression(expr, max_len)
-                    return
-                if j + 1 == len(self.axioms_):
-                    break
-                expr = modus_ponens(self.axioms_[-1], self.axioms_[j])
+                    return True
+        return False
+
+    def record_macro(self, rule: DerivedRule, premises: List[Expression], expression: Expression):
+        representation = expression.to_string()
+        self.dump_.write(f"{representation} {rule.name} {' '.join(str(premise) for premise in premises)}\n")
+        if representation not in self.macros_:
+            self.macros_[representation] = (rule, [Expression(premise) for premise in premises])
+
+    def expand_macro(self, expression: str) -> List[Tuple[str, List[str]]]:
+        rule, premises = self.macros_[expression]
+        return rule.expand(premises)
+
+    def detach(self, minor: Expression, j: int) -> Expression:
+        # the axioms and hypotheses are majors for every new formula, their matchers are generated once
+        if j >= self.base_:
+            return modus_ponens(minor, self.formula(j), self.stats_)
+        while len(self.matchers_) <= j:
+            self.matchers_.append(matcher(self.axioms_[len(self.matchers_)]))
+        return detach(minor, self.axioms_[j], self.matchers_[j], self.stats_)
+
+    def expired(self) -> bool:
+        return time.time() * 1000 > self.time_limit_
+
+    def candidates(self, useful: int, count: int) -> Iterator[List[Entry]]:
+        # the first stage: entries of the current generation in batches, the useful formulas first, the
+        # next batch is popped only when the previous one has gone through the whole pipeline
+        batch = []
+        for i in range(useful + count):
+            if self.expired():
+                break
+            batch.append(heapq.heappop(self.useful_)[3] if i < useful else self.produced_.popleft())
+            if len(batch) == self.batch_size_:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def materialized(self, batches: Iterator[List[Entry]], max_len: int) -> Iterator[List[Expression]]:
+        for batch in batches:
+            yield [expression for expression in (self.materialize(entry, max_len) for entry in batch)
+                   if expression is not None]
+
+    def bounded(self, batches: Iterator[List[Expression]], max_len: int) -> Iterator[List[Expression]]:
+        for batch in batches:
+            result = [expression for expression in batch if 2 * max_len >= len(expression)]
+            if self.stats_ is not None:
+                self.stats_.count('formulas.too_long', len(batch) - len(result))
+            yield result
+
+    def deduplicated(self, batches: Iterator[List[Expression]]) -> Iterator[List[Expression]]:
+        for batch in batches:
+            result = []
+            keys = set()
+            for expression in batch:
+                expression.normalize()
+                key = canonical_form(expression)
+                if key in self.known_axioms_ or key in keys:
+                    self.count('formulas.duplicate')
+                    continue
+                keys.add(key)
+                result.append(expression)
+            yield result
+
+    def insert(self, batches: Iterator[List[Expression]], max_len: int) -> Generator[None, None, bool]:
+        # the last stage changes the state of the search, so it runs on one formula at a time
+        for batch in batches:
+            for expression in batch:
+                yield
+                if self.expired():
+                    return False
+                self.count('formulas.added')
+                if not self.add_expression(expression, max_len):
+                    continue
+                if self.is_target_proved_by(expression):
+                    return True
+                if self.active_ is not None:
+                    self.evict()
+                if (yield from self.apply_rules(max_len)):
+                    return True
+                if self.frontier_limit_ is not None and len(self.produced_) >= self.frontier_limit_:
+                    # the frontier is full: pairing the formula with the others waits until it drains
+                    self.count('pipeline.deferred')
+                    self.deferred_.append(len(self.axioms_) - 1)
+                    self.hold(len(self.axioms_) - 1)
+                    continue
+                if (yield from self.generate(len(self.axioms_) - 1, max_len)):
+                    return True
+        return False
+
+    def partners(self, newest: int) -> Iterator[Tuple[int, bool, bool]]:
+        # j, whether j may be the minor premise for the newest formula and whether it may be the major one
+        if self.skeletons_ is None:
+            if self.active_ is None:
+                return ((j, True, j != newest) for j in range(newest + 1))
+            return ((j, True, j != newest) for j in sorted(self.active_.weights_) if j <= newest)
+        partners, rejected = self.skeletons_.partners(newest)
+        if self.stats_ is not None:
+            self.stats_.count('pairs.skeleton', rejected)
+        return partners
+
+    def generate(self, newest: int, max_len: int) -> Generator[None, None, bool]:
+        # yields before every pair, a new formula may have thousands of partners
+        if self.active_ is not None:
+            self.formula(newest)
+        if self.lazy_:
+            for j, minor, major in self.partners(newest):
+                yield
+                if minor and self.add_pair(j, newest, max_len) or major and self.add_pair(newest, j, max_len):
+                    return True
+            return False
+        for j, minor, major in self.partners(newest):
+            yield
+            if minor:
+                expr = modus_ponens(self.axioms_[j], self.axioms_[newest], self.stats_)
                 if self.add_produced(expr, max_len):
-                    self.dump_.write(f"{expr} mp {self.axioms_[-1]} {self.axioms_[j]}\n")
+                    self.dump_.write(f"{expr} mp {self.axioms_[j]} {self.axioms_[newest]}\n")
                 if self.is_target_proved_by(expr):
                     self.add_expression(expr, max_len)
-                    return
-        if time.time() * 1000 > self.time_limit_:
+                    return True
+            if not major:
+                continue
+            expr = self.detach(self.axioms_[newest], j)
+            if self.add_produced(expr, max_len):
+                self.dump_.write(f"{expr} mp {self.axioms_[newest]} {self.axioms_[j]}\n")
+            if self.is_target_proved_by(expr):
+                self.add_expression(expr, max_len)
+                return True
+        return False
+
+    def resume(self, max_len: int) -> Generator[None, None, bool]:
+        while self.deferred_ and (self.frontier_limit_ is None or len(self.produced_) < self.frontier_limit_):
+            if self.expired():
+                return False
+            newest = self.deferred_.popleft()
+            found = yield from self.generate(newest, max_len)
+            self.release(newest)
+            if found:
+                return True
+        return False
+
+    def produce(self, max_len: int) -> Iterator[None]:
+        if (yield from self.resume(max_len)) or not self.produced_ and not self.useful_:
             return
-        print(f"newly produced: {len(self.produced_)}", file=sys.stderr)
+        self.generation_ += 1
+        if self.order_ == 'shortest':
+            ordered = sorted(self.produced_, key=self.size)
+            self.produced_.clear()
+            self.produced_.extend(ordered)
+        batches = self.candidates(len(self.useful_), len(self.produced_))
+        batches = self.materialized(batches, max_len)
+        batches = self.bounded(batches, max_len)
+        for stage in self.filters_:
+            batches = stage(batches)
+        batches = self.deduplicated(batches)
+        yield from self.insert(batches, max_len)
 
     def solve(self):
+        for _ in self.steps():
+            pass
+
+    def steps(self) -> Iterator[None]:
+        # the whole solution as a generator that yields after every formula and every pair of the search and
+        # every line of the fallback and the extraction, so that one process can run many solvers in turns;
+        # the time limit counts from the start of the search
+        try:
+            yield from self.prove()
+        finally:
+            self.done_ = True
+            if self.dump_path_ is None:
+                self.dump_.close()
+            if self.library_ is not None:
+                self.library_.finish_run()
+            if self.stats_ is not None:
+                self.stats_.finish({
+                    'target': self.targets_[0].to_string(),
+                    'proved': self.proved_,
+                    'method': self.method_,
+                    'known': len(self.axioms_),
+                    'pending': len(self.produced_),
+                })
+            # a spilling frontier holds a temporary file and its mapping
+            if isinstance(self.produced_, SpillingFrontier):
+                self.produced_.close()
+
+    def step(self, budget: int = 1000) -> bool:
+        # runs at most budget units of the search and keeps its state for the next call, True once it is over
+        if self.steps_ is None:
+            self.steps_ = self.steps()
+        for _ in itertools.islice(self.steps_, budget):
+            pass
+        return self.done_
+
+    def refute(self) -> bool:
+        if not self.refutable_:
+            return False
+        with self.phase('refutation'):
+            valuation = falsify(self.targets_[0])
+        if valuation is None:
+            return False
+        row = ', '.join(f"{literal(leaf, True)}={int(value)}" for leaf, value in valuation.items())
+        self.method_ = 'refuted'
+        self.ss += f"The expression is not a tautology, it is false when {row}\n"
+        return True
+
+    def seed(self):
+        # a large library is cut down to the lemmas that look like the targets
+        if len(self.library_) > self.seeds_:
+            seeds = PremiseSelector(self.library_).select(self.targets_, self.seeds_)
+        else:
+            seeds = self.library_.seeds(self.seeds_)
+        for formula, derivation in seeds:
+            for expression, premises in derivation:
+                if premises:
+                    self.dump_.write(f"{expression} mp {premises[0]} {premises[1]}\n")
+                else:
+                    self.dump_.write(f"{expression}  axiom\n")
+            self.count('library.seeded')
+            expression = Expression(formula.lower())
+            expression.normalize()
+            self.produced_.append(expression)
+
+    def learn(self, ts: TopoSort, conclusions: Dict[str, List[str]]) -> Iterator[None]:
+        # only lemmas without constants are kept, the constants come from the target and its hypotheses
+        # and print in lowercase; a seed is normalized by the search, so its text must already be normal
+        for text in ts.order_:
+            yield
+            if not ts.premises(text) or any(char.islower() for char in text):
+                continue
+            try:
+                expression = Expression(text.lower())
+            except RuntimeError:
+                continue
+            expression.normalize()
+            if expression.to_string() != text:
+                continue
+            derivation = TopoSort(conclusions, text, self.expand_macro).lines()
+            if not any(char.islower() for line, _ in derivation for char in line):
+                self.library_.record(canonical_form(expression), text, derivation)
+
+    def prove(self) -> Iterator[None]:
         self.ss = ''
-        len_target = len(self.targets_[-1])
-        while self.deduction_theorem_decomposition(self.targets_[-1]):
+        if self.refute():
+            return
+        len_target = max(1, int(len(self.targets_[-1]) * self.size_factor_))
+        while self.decompose_ and self.deduction_theorem_decomposition(self.targets_[-1]):
             prev = self.targets_[-2]
             curr = self.targets_[-1]
             axiom = self.axioms_[-1]
@@ -264,44 +680,144 @@ class Solver:
             axiom.normalize()
             self.produced_.append(axiom)
             self.dump_.write(f"{axiom}  axiom\n")
-        self.produced_.append(Expression("(!a>!b)>(b>a)"))
+        # the contraposition lemma is seeded together with its derivation
+        lemma = Proof()
+        contraposition = Lemmas.apply(lemma, 'contraposition', {1: Expression("!a"), 2: Expression("!b")})
+        for idx in lemma.ancestors(contraposition):
+            refs = lemma.refs_[idx]
+            if refs:
+                self.dump_.write(f"{lemma[idx]} mp {lemma[refs[0]]} {lemma[refs[1]]}\n")
+            else:
+                self.dump_.write(f"{lemma[idx]}  axiom\n")
+        self.produced_.append(Expression(lemma[contraposition]))
+        self.base_ = len(self.produced_)
+        if self.library_ is not None:
+            self.lemma_size_ = max(map(len, self.library_.lemmas_), default=0)
+            self.seed()
         self.axioms_.clear()
         self.known_axioms_.clear()
+        self.shapes_.clear()
+        if self.skeletons_ is not None:
+            self.skeletons_.clear()
+        if self.active_ is not None:
+            self.active_.reset(self.base_)
+            self.passive_.clear()
+            self.pending_.clear()
+        self.goal_size_ = max(len(target) for target in self.targets_)
+        self.goals_.clear()
+        self.reordered_.clear()
+        self.reordered_targets_.clear()
+        for target in self.targets_:
+            self.goals_.add(target)
+            if reorderable(target):
+                canonical = Expression(target)
+                canonical.canonicalize()
+                self.reordered_.add(canonical)
+                self.reordered_targets_.append(target)
+        # the preparation is a slice of its own
+        yield
         time_start = time.time() * 1000
-        self.time_limit_ = time_start + self.time_limit_
-        while time.time() * 1000 < self.time_limit_:
-            self.produce(len_target)
-            if self.is_target_proved_by(self.axioms_[-1]):
-                break
-        if not any(self.is_target_proved_by(axiom) for axiom in self.axioms_):
+        deadline = time_start + self.time_limit_
+        if self.fallback_ and KalmarSolver(self.targets_[0]).supported():
+            self.time_limit_ = deadline - FALLBACK_SHARE * self.time_limit_
+        else:
+            self.time_limit_ = deadline
+        with self.phase('search'):
+            while not self.stopped_ and time.time() * 1000 < self.time_limit_:
+                size = len(self.produced_)
+                known = len(self.axioms_)
+                start = time.perf_counter()
+                yield from self.produce(len_target)
+                if self.stats_ is not None:
+                    self.stats_.generation({'size': size, 'produced': len(self.produced_),
+                                            'known': len(self.axioms_), 'seconds': time.perf_counter() - start})
+                # a stopped or expired generation may insert nothing, and the newest formula may be demoted
+                newest = self.axioms_[-1] if len(self.axioms_) > known else None
+                if newest is not None and self.is_target_proved_by(newest):
+                    break
+        proof, found = yield from self.find()
+        if found is None:
+            if self.stopped_:
+                self.method_ = 'stopped'
+                self.ss += "The search was stopped\n"
+                return
+            if not self.fallback_:
+                self.method_ = 'timeout'
+                self.ss += "No proof was found in the time allotted\n"
+                return
+            self.method_ = 'kalmar'
             self.ss += "No proof was found in the time allotted\n"
+            with self.phase('fallback'):
+                # the construction gets what is left of the time limit
+                fallback = KalmarSolver(self.targets_[0], max(0.0, deadline - time.time() * 1000))
+                for _ in fallback.steps():
+                    if self.stopped_:
+                        self.method_ = 'stopped'
+                        self.ss += "The search was stopped\n"
+                        return
+                    yield
+                self.proved_ = fallback.proved_
+                if fallback.expired():
+                    self.method_ = 'timeout'
+            self.ss += fallback.thought_chain()
             return
-        proof = None
-        target_proved = None
+        self.method_ = 'search'
+        self.proved_ = True
+        with self.phase('extraction'):
+            yield from self.extract(proof, found)
+
+    def find(self) -> Generator[None, None, Tuple[Optional[Expression], Optional[Tuple[Expression, Optional[Binding]]]]]:
+        # the first known formula that proves a target
         for axiom in self.axioms_:
-            if proof:
-                break
-            for target in self.targets_:
-                if is_equal(target, axiom):
-                    proof = axiom
-                    target_proved = target
-                    break
+            yield
+            if axiom is None:
+                continue
+            found = self.proved_target(axiom)
+            if found is not None:
+                return axiom, found
+        return None, None
+
+    def extract(self, proof: Expression, found: Tuple[Expression, Optional[Binding]]) -> Iterator[None]:
+        target_proved, binding = found
         self.dump_.flush()
+        self.dump_.seek(0)
         conclusions_ = {}
-        with open("conclusions.txt") as conclusions:
-            for line in conclusions:
-                parts = line.strip().split()
-                expr = parts[0]
+        for line in self.dump_:
+            yield
+            parts = line.strip().split()
+            expr = parts[0]
+            if expr not in conclusions_:
                 conclusions_[expr] = parts[1:]
-        ts = TopoSort(conclusions_, proof.to_string())
-        self.ss += ts.to_string()
-        substitution = {}
-        unification(target_proved, proof, substitution)
-        if substitution:
+        self.dump_.seek(0, 2)
+        ts = TopoSort(conclusions_, proof.to_string(), self.expand_macro)
+        yield
+        if binding is None:
+            self.ss += (yield from compressing(self.reorder(ts.to_string(), proof, target_proved)))
+        else:
+            self.ss += (yield from compressing(ts.to_string()))
+        if self.library_ is not None:
+            yield from self.learn(ts, conclusions_)
+        if binding:
             self.ss += f"change variables: {proof}\n"
-            for v, s in substitution.items():
+            for v, s in sorted(binding.items()):
                 self.ss += f"{chr(v + ord('A') - 1)} -> {s}\n"
             self.ss += f"proved: {target_proved}\n"
 
+    @staticmethod
+    def reorder(text: str, proof: Expression, target: Expression) -> str:
+        # the target is an instance of the proved formula only up to the order of conjuncts: the proof goes
+        # on with a derivation of instance>target and modus ponens, which also instantiates the formula
+        general = Expression(proof)
+        general.canonicalize()
+        canonical = Expression(target)
+        canonical.canonicalize()
+        instance = Expression(proof)
+        for value, subterm in match(general.subtree_copy(0), canonical.subtree_copy(0)).items():
+            instance.replace(value, subterm)
+        lemma, conclusion = commutation(instance.subtree_copy(0), target.subtree_copy(0))
+        steps = sum(1 for line in text.splitlines() if STEP.match(line))
+        implication = steps + len(lemma.ancestors(conclusion))
+        return text + lemma.to_string(conclusion, steps) + f"{implication + 1}. step({steps},{implication}): {target}\n"
+
     def thought_chain(self) -> str:
         return self.ss
@@ -0,0 +1,123 @@
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Iterable, List, Optional, Sequence, Tuple
+from constructor import Expression
+from modus_ponens import modus_ponens
+from codec import preorder, assemble, encode_many, decode_many
+
+# formulas are stored as flat int32 records [count, tag, value, tag, value, ...] with the nodes in preorder
+# (the tags of codec.py), slot 0 holds the number of used slots and a formula is referenced by the offset
+# of its record, so the worker processes read the formulas in place instead of unpickling them
+SLOT_SIZE = 4
+USED = 0
+
+
+class FormulaArena:
+    def __init__(self, capacity: int = 1 << 20, name: Optional[str] = None):
+        self.owner_ = name is None
+        if self.owner_:
+            if capacity < 2:
+                raise ValueError("The arena needs at least two slots")
+            self.memory_ = shared_memory.SharedMemory(create=True, size=capacity * SLOT_SIZE)
+        else:
+            # the processes of the pool share the resource tracker of the creator, only the creator unlinks the block
+            self.memory_ = shared_memory.SharedMemory(name=name)
+        self.slots_ = self.memory_.buf.cast('i')
+        if self.owner_:
+            self.slots_[USED] = 1
+
+    @property
+    def name(self) -> str:
+        return self.memory_.name
+
+    @property
+    def capacity(self) -> int:
+        return len(self.slots_)
+
+    def __len__(self):
+        return self.slots_[USED]
+
+    def append(self, expression: Expression) -> int:
+        offset = self.slots_[USED]
+        end = offset + 1 + 2 * len(expression)
+        if end > len(self.slots_):
+            raise MemoryError(f"The formula arena is full ({len(self.slots_)} slots)")
+        slots = self.slots_
+        pos = offset + 1
+        for tag, value in preorder(expression):
+            slots[pos] = tag
+            slots[pos + 1] = value
+            pos += 2
+        slots[offset] = len(expression)
+        # the record becomes visible to the readers only after it is written
+        slots[USED] = end
+        return offset
+
+    def extend(self, expressions: Iterable[Expression]) -> List[int]:
+        return [self.append(expression) for expression in expressions]
+
+    def read(self, offset: int) -> Expression:
+        if not 0 < offset < self.slots_[USED]:
+            raise IndexError(f"No formula at offset {offset}")
+        count = self.slots_[offset]
+        record = self.slots_[offset + 1:offset + 1 + 2 * count]
+        try:
+            return assemble(zip(record[::2], record[1::2]))
+        finally:
+            record.release()
+
+    def clear(self):
+        self.slots_[USED] = 1
+
+    def close(self):
+        self.slots_.release()
+        self.memory_.close()
+
+    def unlink(self):
+        if self.owner_:
+            self.memory_.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self.unlink()
+
+
+ARENA_: Optional[FormulaArena] = None
+
+
+def attach(name: str):
+    global ARENA_
+    ARENA_ = FormulaArena(name=name)
+
+
+def detach_pairs(pairs: Sequence[Tuple[int, int]]) -> bytes:
+    # runs in a worker: the task is a list of offsets and the answer is the conclusions in the codec format
+    return encode_many(modus_ponens(ARENA_.read(minor), ARENA_.read(major)) for minor, major in pairs)
+
+
+class ArenaPool:
+    # worker processes attached to one arena, modus ponens of the pairs of offsets is computed in parallel
+    def __init__(self, arena: FormulaArena, processes: Optional[int] = None, chunk: int = 256):
+        self.arena_ = arena
+        self.chunk_ = chunk
+        self.pool_ = multiprocessing.Pool(processes, initializer=attach, initargs=(arena.name,))
+
+    def detach(self, pairs: Sequence[Tuple[int, int]]) -> List[Expression]:
+        tasks = [pairs[start:start + self.chunk_] for start in range(0, len(pairs), self.chunk_)]
+        result = []
+        for data in self.pool_.imap(detach_pairs, tasks):
+            result.extend(decode_many(data))
+        return result
+
+    def close(self):
+        self.pool_.close()
+        self.pool_.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,190 @@
+from typing import Dict, List, Optional, Tuple
+from constructor import Expression, Operation
+
+# reduced ordered binary decision diagrams: node 0 is false, node 1 is true, any other node is a triple
+# (level, low, high) with low != high, and the unique table keeps one node per triple, so two formulas
+# over the same leaves are equivalent exactly when their nodes are the same
+Leaf = Tuple[str, int]
+FALSE, TRUE = 0, 1
+TERMINAL = 1 << 30
+
+
+class BDD:
+    def __init__(self, gc_threshold: int = 1 << 16):
+        self.level_: List[int] = [TERMINAL, TERMINAL]
+        self.low_: List[int] = [FALSE, TRUE]
+        self.high_: List[int] = [FALSE, TRUE]
+        # nodes with external references survive garbage collection, together with everything below them
+        self.refs_: List[int] = [1, 1]
+        self.unique_: Dict[Tuple[int, int, int], int] = {}
+        self.cache_: Dict[Tuple[Operation, int, int], int] = {}
+        self.free_: List[int] = []
+        # the variable order is the order in which the leaves are first seen
+        self.levels_: Dict[Leaf, int] = {}
+        self.leaves_: List[Leaf] = []
+        self.gc_threshold_ = gc_threshold
+
+    def __len__(self):
+        return len(self.unique_)
+
+    def level(self, leaf: Leaf) -> int:
+        if leaf not in self.levels_:
+            self.levels_[leaf] = len(self.leaves_)
+            self.leaves_.append(leaf)
+        return self.levels_[leaf]
+
+    def node(self, level: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+        key = (level, low, high)
+        result = self.unique_.get(key)
+        if result is not None:
+            return result
+        if self.free_:
+            result = self.free_.pop()
+            self.level_[result], self.low_[result], self.high_[result] = key
+            self.refs_[result] = 0
+        else:
+            result = len(self.level_)
+            self.level_.append(level)
+            self.low_.append(low)
+            self.high_.append(high)
+            self.refs_.append(0)
+        self.unique_[key] = result
+        return result
+
+    def variable(self, leaf: Leaf) -> int:
+        return self.node(self.level(leaf), FALSE, TRUE)
+
+    def negate(self, u: int) -> int:
+        if u <= TRUE:
+            return TRUE - u
+        key = (Operation.NEGATION, u, u)
+        result = self.cache_.get(key)
+        if result is None:
+            result = self.node(self.level_[u], self.negate(self.low_[u]), self.negate(self.high_[u]))
+            self.cache_[key] = result
+        return result
+
+    def terminal_case(self, op: Operation, u: int, v: int) -> Optional[int]:
+        if op == Operation.CONJUNCTION:
+            if u == FALSE or v == FALSE:
+                return FALSE
+            if u == TRUE or u == v:
+                return v
+            return u if v == TRUE else None
+        if op == Operation.DISJUNCTION:
+            if u == TRUE or v == TRUE:
+                return TRUE
+            if u == FALSE or u == v:
+                return v
+            return u if v == FALSE else None
+        if op == Operation.IMPLICATION:
+            if u == FALSE or v == TRUE or u == v:
+                return TRUE
+            if u == TRUE:
+                return v
+            return self.negate(u) if v == FALSE else None
+        if op == Operation.XOR:
+            if u == v:
+                return FALSE
+            if u <= TRUE:
+                return v if u == FALSE else self.negate(v)
+            if v <= TRUE:
+                return u if v == FALSE else self.negate(u)
+            return None
+        if op == Operation.EQUIVALENT:
+            if u == v:
+                return TRUE
+            if u <= TRUE:
+                return v if u == TRUE else self.negate(v)
+            if v <= TRUE:
+                return u if v == TRUE else self.negate(u)
+            return None
+        raise ValueError(f"Unsupported operation {op}")
+
+    def apply(self, op: Operation, u: int, v: int) -> int:
+        result = self.terminal_case(op, u, v)
+        if result is not None:
+            return result
+        if op != Operation.IMPLICATION and u > v:
+            u, v = v, u
+        key = (op, u, v)
+        result = self.cache_.get(key)
+        if result is not None:
+            return result
+        level = min(self.level_[u], self.level_[v])
+        u_low, u_high = (self.low_[u], self.high_[u]) if self.level_[u] == level else (u, u)
+        v_low, v_high = (self.low_[v], self.high_[v]) if self.level_[v] == level else (v, v)
+        result = self.node(level, self.apply(op, u_low, v_low), self.apply(op, u_high, v_high))
+        self.cache_[key] = result
+        return result
+
+    def build(self, expression: Expression, idx: int = 0) -> int:
+        term = expression[idx]
+        if term.type != 'Function':
+            result = self.variable((term.type, term.value))
+            return self.negate(result) if term.op == Operation.NEGATION else result
+        rel = expression.subtree(idx)
+        return self.apply(term.op, self.build(expression, rel.left()), self.build(expression, rel.right()))
+
+    def from_expression(self, expression: Expression) -> int:
+        # collection only happens between two conversions, when every live node is referenced
+        if len(self.unique_) > self.gc_threshold_:
+            self.collect()
+        if expression.empty():
+            raise ValueError("An empty expression has no BDD")
+        return self.build(expression)
+
+    def ref(self, u: int) -> int:
+        self.refs_[u] += 1
+        return u
+
+    def deref(self, u: int):
+        if self.refs_[u] <= 0:
+            raise ValueError(f"Node {u} is not referenced")
+        self.refs_[u] -= 1
+
+    def collect(self) -> int:
+        alive = [False] * len(self.level_)
+        stack = [u for u, refs in enumerate(self.refs_) if refs > 0]
+        while stack:
+            u = stack.pop()
+            if alive[u]:
+                continue
+            alive[u] = True
+            if u > TRUE:
+                stack.append(self.low_[u])
+                stack.append(self.high_[u])
+        dead = [key for key, u in self.unique_.items() if not alive[u]]
+        for key in dead:
+            self.free_.append(self.unique_.pop(key))
+        self.cache_.clear()
+        return len(dead)
+
+    def falsify(self, u: int) -> Optional[Dict[Leaf, bool]]:
+        # every node other than true has a path to false, the leaves off the path may take any value
+        if u == TRUE:
+            return None
+        valuation = {}
+        while u > TRUE:
+            leaf = self.leaves_[self.level_[u]]
+            value = self.low_[u] == TRUE
+            valuation[leaf] = value
+            u = self.high_[u] if value else self.low_[u]
+        return valuation
+
+
+def is_tautology(expression: Expression) -> bool:
+    return BDD().from_expression(expression) == TRUE
+
+
+def falsify(expression: Expression) -> Optional[Dict[Leaf, bool]]:
+    bdd = BDD()
+    return bdd.falsify(bdd.from_expression(expression))
+
+
+def are_equivalent(left: Expression, right: Expression) -> bool:
+    bdd = BDD()
+    u = bdd.ref(bdd.from_expression(left))
+    return bdd.from_expression(right) == u
@@ -0,0 +1,157 @@
+import io
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import tempfile
+import contextlib
+from typing import List, Dict, Tuple
+from parser import ExpressionParser
+from constructor import Expression
+from exp_methods import unification
+from modus_ponens import modus_ponens
+from algorithm import Solver
+from rules import DERIVED_RULES
+from checker import ProofChecker
+from main import AXIOMS
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+CORPUS = os.path.join(DIRECTORY, 'corpus.txt')
+BASELINE = os.path.join(DIRECTORY, 'benchmark_baseline.json')
+FORMULA = "(a>(b>c))>((a>b)>(a>c))"
+MINOR = "(a>b)>((c>a)>(c>b))"
+
+
+def load_corpus(path: str = CORPUS) -> List[Tuple[str, str, str]]:
+    corpus = []
+    with open(path) as file:
+        for line in file:
+            if not line.strip() or line.startswith('#'):
+                continue
+            level, name, target = line.split()
+            corpus.append((level, name, target))
+    return corpus
+
+
+def micro(repeat: int) -> Dict[str, float]:
+    # nanoseconds per call, the best of several runs
+    formula = Expression(FORMULA)
+    minor = Expression(MINOR)
+    replacement = Expression("a>b")
+    cases = {
+        'parse': lambda: ExpressionParser(FORMULA).parse(),
+        'normalize': lambda: Expression(formula).normalize(),
+        'to_string': lambda: formula.to_string(),
+        'subtree_copy': lambda: formula.subtree_copy(0),
+        'replace': lambda: Expression(formula).replace(1, replacement),
+        'unification': lambda: unification(minor, formula.subtree_copy(formula.subtree(0).left()), {}),
+        'modus_ponens': lambda: modus_ponens(minor, formula),
+    }
+    results = {}
+    for name, case in cases.items():
+        timer = timeit.Timer(case)
+        number, _ = timer.autorange()
+        results[name] = min(timer.repeat(repeat, number)) / number * 1e9
+    return results
+
+
+def end_to_end(corpus: List[Tuple[str, str, str]], budget_ms: int) -> Dict[str, dict]:
+    checker = ProofChecker()
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as directory:
+        for level, name, text in corpus:
+            target = Expression(text)
+            target.standardize()
+            target.make_permanent()
+            solver = Solver([Expression(axiom) for axiom in AXIOMS], target, budget_ms, DERIVED_RULES,
+                            dump_path=os.path.join(directory, 'conclusions.txt'))
+            start = time.perf_counter()
+            with contextlib.redirect_stderr(io.StringIO()):
+                solver.solve()
+            elapsed = time.perf_counter() - start
+            solver.dump_.close()
+            chain = solver.thought_chain()
+            verified, _ = checker.check(chain, str(target))
+            results[name] = {
+                'level': level,
+                'target': text,
+                'seconds': elapsed,
+                'proved': solver.proved_,
+                'verified': verified,
+                'method': solver.method_,
+                'steps': sum(1 for line in chain.splitlines() if '. step(' in line),
+            }
+            print(f"{name:32} {elapsed:8.3f}s {results[name]['method']:7} {results[name]['steps']:5} steps",
+                  file=sys.stderr)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    # a regression is a slowdown by more than the threshold or a target that is no longer proved
+    regressions = []
+    for name, value in current['micro'].items():
+        old = baseline.get('micro', {}).get(name)
+        if old and value > old * threshold:
+            regressions.append(f"micro {name}: {old:.0f}ns -> {value:.0f}ns")
+    for name, run in current['end_to_end'].items():
+        old = baseline.get('end_to_end', {}).get(name)
+        if old is None:
+            continue
+        if old['proved'] and not run['proved']:
+            regressions.append(f"{name}: no longer proved")
+        elif run['seconds'] > old['seconds'] * threshold and run['seconds'] - old['seconds'] > 0.05:
+            regressions.append(f"{name}: {old['seconds']:.3f}s -> {run['seconds']:.3f}s")
+        elif run['steps'] > old['steps']:
+            regressions.append(f"{name}: {old['steps']} -> {run['steps']} steps")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks and end-to-end runs of the prover")
+    parser.add_argument('--corpus', default=CORPUS)
+    parser.add_argument('--level', action='append', help="only run targets of this level, may be repeated")
+    parser.add_argument('--budget', type=int, default=5000, help="search budget per target, ms")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write the results as JSON")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=1.25)
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-end-to-end', action='store_true')
+    args = parser.parse_args()
+
+    corpus = [entry for entry in load_corpus(args.corpus) if not args.level or entry[0] in args.level]
+    results = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'budget_ms': args.budget,
+        'micro': {} if args.skip_micro else micro(args.repeat),
+        'end_to_end': {} if args.skip_end_to_end else end_to_end(corpus, args.budget),
+    }
+    for name, value in results['micro'].items():
+        print(f"{name:32} {value:10.0f} ns", file=sys.stderr)
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            file.write(text + '\n')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(text)
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"regression: {regression}")
+    print(f"{len(regressions)} regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
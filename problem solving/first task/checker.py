@@ -0,0 +1,318 @@
+import re
+import sys
+from typing import List, Dict, Tuple, Iterable, Optional
+
+AXIOMS = [
+    "A>(B>A)",
+    "(A>(B>C))>((A>B)>(A>C))",
+    "(!A>!B)>((!A>B)>A)",
+]
+
+NEGATION = '!'
+PRIORITIES = {'>': 1, '+': 2, '=': 2, '|': 3, '*': 4}
+# negation is pushed to the leaves the same way Expression.negation() does it
+OPPOSITE = {'>': '*', '*': '>', '|': '*', '+': '=', '=': '+'}
+
+STEP = re.compile(r'^\s*(\d+)\. step\(([\d,\s]*)\): (\S+)\s*$')
+DEDUCTION = re.compile(r'Γ ⊢ (\S+) <=> Γ U \{(.+)\} ⊢ (\S+)')
+CHANGE = re.compile(r'^\s*change variables: (\S+)\s*$')
+BINDING = re.compile(r'^\s*([A-Z]) -> (\S+)\s*$')
+PROVED = re.compile(r'^\s*proved: (\S+)\s*$')
+
+
+class ProofChecker:
+    def __init__(self, axioms: List[str] = AXIOMS):
+        # formulas are interned: a leaf is ('V' or 'C', name, negated), a node is (op, left id, right id)
+        self.terms_: List[tuple] = []
+        self.ids_: Dict[tuple, int] = {}
+        self.negations_: Dict[int, int] = {}
+        self.renamed_: Dict[Tuple[int, int], int] = {}
+        self.axiom_instances_: Dict[int, bool] = {}
+        self.axioms_ = [self.parse(axiom) for axiom in axioms]
+
+    def intern(self, term: tuple) -> int:
+        idx = self.ids_.get(term)
+        if idx is None:
+            idx = len(self.terms_)
+            self.terms_.append(term)
+            self.ids_[term] = idx
+        return idx
+
+    def is_leaf(self, idx: int) -> bool:
+        return self.terms_[idx][0] in {'V', 'C'}
+
+    def negate(self, idx: int) -> int:
+        if idx in self.negations_:
+            return self.negations_[idx]
+        term = self.terms_[idx]
+        if self.is_leaf(idx):
+            result = self.intern((term[0], term[1], not term[2]))
+        elif term[0] in {'+', '='}:
+            result = self.intern((OPPOSITE[term[0]], term[1], term[2]))
+        elif term[0] == '|':
+            result = self.intern(('*', self.negate(term[1]), self.negate(term[2])))
+        else:
+            result = self.intern((OPPOSITE[term[0]], term[1], self.negate(term[2])))
+        self.negations_[idx] = result
+        self.negations_[result] = idx
+        return result
+
+    def parse(self, text: str) -> int:
+        tokens = [token for token in text if not token.isspace()]
+        position = 0
+
+        def operand() -> int:
+            nonlocal position
+            if position >= len(tokens):
+                raise ValueError(f"Unexpected end of formula: {text}")
+            token = tokens[position]
+            position += 1
+            if token == NEGATION:
+                return self.negate(operand())
+            if token == '(':
+                result = binary(0)
+                if position >= len(tokens) or tokens[position] != ')':
+                    raise ValueError(f"Incorrect parentheses: {text}")
+                position += 1
+                return result
+            if 'a' <= token <= 'z':
+                return self.intern(('C', token, False))
+            if 'A' <= token <= 'Z':
+                return self.intern(('V', token, False))
+            raise ValueError(f"Unexpected symbol {token!r}: {text}")
+
+        def binary(min_priority: int) -> int:
+            nonlocal position
+            lhs = operand()
+            while position < len(tokens) and tokens[position] in PRIORITIES and \
+                    PRIORITIES[tokens[position]] >= min_priority:
+                op = tokens[position]
+                position += 1
+                # operators of equal priority group to the right, as in ExpressionParser
+                rhs = binary(PRIORITIES[op])
+                lhs = self.intern((op, lhs, rhs))
+            return lhs
+
+        result = binary(0)
+        if position != len(tokens):
+            raise ValueError(f"Unexpected symbol {tokens[position]!r}: {text}")
+        return result
+
+    def to_string(self, idx: int, root=True) -> str:
+        term = self.terms_[idx]
+        if self.is_leaf(idx):
+            return ('!' if term[2] else '') + str(term[1])
+        result = f"{self.to_string(term[1], False)}{term[0]}{self.to_string(term[2], False)}"
+        return result if root else f"({result})"
+
+    def rename(self, idx: int, side: int) -> int:
+        # renames variables apart by tagging them with the premise they come from
+        key = (idx, side)
+        if key in self.renamed_:
+            return self.renamed_[key]
+        term = self.terms_[idx]
+        if term[0] == 'V':
+            result = self.intern(('V', (side, term[1]), term[2]))
+        elif term[0] == 'C':
+            result = idx
+        else:
+            result = self.intern((term[0], self.rename(term[1], side), self.rename(term[2], side)))
+        self.renamed_[key] = result
+        return result
+
+    def walk(self, idx: int, substitution: Dict[object, int]) -> int:
+        term = self.terms_[idx]
+        while term[0] == 'V' and term[1] in substitution:
+            idx = substitution[term[1]]
+            if term[2]:
+                idx = self.negate(idx)
+            term = self.terms_[idx]
+        return idx
+
+    def occurs(self, name, idx: int, substitution: Dict[object, int]) -> bool:
+        stack = [idx]
+        while stack:
+            current = self.walk(stack.pop(), substitution)
+            term = self.terms_[current]
+            if term[0] == 'V':
+                if term[1] == name:
+                    return True
+            elif term[0] != 'C':
+                stack.extend(term[1:])
+        return False
+
+    def unify(self, left: int, right: int, substitution: Dict[object, int]) -> bool:
+        stack = [(left, right)]
+        while stack:
+            lhs, rhs = stack.pop()
+            lhs = self.walk(lhs, substitution)
+            rhs = self.walk(rhs, substitution)
+            if lhs == rhs:
+                continue
+            if self.terms_[lhs][0] != 'V' and self.terms_[rhs][0] == 'V':
+                lhs, rhs = rhs, lhs
+            term = self.terms_[lhs]
+            if term[0] == 'V':
+                value = self.negate(rhs) if term[2] else rhs
+                if self.occurs(term[1], value, substitution):
+                    return False
+                substitution[term[1]] = value
+                continue
+            other = self.terms_[rhs]
+            if self.is_leaf(lhs) or self.is_leaf(rhs) or term[0] != other[0]:
+                return False
+            stack.append((term[1], other[1]))
+            stack.append((term[2], other[2]))
+        return True
+
+    def substitute(self, idx: int, substitution: Dict[object, int], memo: Dict[int, int]) -> int:
+        if idx in memo:
+            return memo[idx]
+        current = self.walk(idx, substitution)
+        term = self.terms_[current]
+        if self.is_leaf(current):
+            result = current
+        else:
+            result = self.intern((term[0], self.substitute(term[1], substitution, memo),
+                                  self.substitute(term[2], substitution, memo)))
+        memo[idx] = result
+        return result
+
+    def matches(self, general: int, instance: int, binding: Dict[object, int]) -> bool:
+        stack = [(general, instance)]
+        while stack:
+            g, s = stack.pop()
+            term = self.terms_[g]
+            if term[0] == 'V':
+                value = self.negate(s) if term[2] else s
+                if binding.setdefault(term[1], value) != value:
+                    return False
+                continue
+            if term[0] == 'C':
+                if g != s:
+                    return False
+                continue
+            other = self.terms_[s]
+            if self.is_leaf(s) or term[0] != other[0]:
+                return False
+            stack.append((term[1], other[1]))
+            stack.append((term[2], other[2]))
+        return True
+
+    def is_axiom_instance(self, idx: int) -> bool:
+        if idx not in self.axiom_instances_:
+            self.axiom_instances_[idx] = any(self.matches(axiom, idx, {}) for axiom in self.axioms_)
+        return self.axiom_instances_[idx]
+
+    def is_consequence(self, minor: int, major: int, conclusion: int) -> bool:
+        # exact modus ponens is a lookup, otherwise the step is a condensed detachment
+        if self.terms_[major] == ('>', minor, conclusion):
+            return True
+        if self.terms_[major][0] != '>':
+            return False
+        major = self.rename(major, 2)
+        substitution = {}
+        if not self.unify(self.rename(minor, 1), self.terms_[major][1], substitution):
+            return False
+        result = self.substitute(self.terms_[major][2], substitution, {})
+        return self.matches(result, conclusion, {})
+
+    def check(self, text: str, target: Optional[str] = None) -> Tuple[bool, str]:
+        # the steps must be valid and the last one, after the printed change of variables, must be one of
+        # the goals: the target or a goal the deduction theorem reduced it to, under its own hypotheses only
+        goals: List[int] = []
+        hypotheses: List[int] = []
+        used = set()
+        lines: Dict[int, int] = {}
+        binding: Dict[object, int] = {}
+        changed = None
+        proved = None
+        steps = 0
+        try:
+            if target is not None:
+                goals.append(self.parse(target))
+            for line in text.splitlines():
+                deduction = DEDUCTION.search(line)
+                if deduction:
+                    goal, hypothesis, rest = (self.parse(deduction.group(i)) for i in (1, 2, 3))
+                    if not goals:
+                        goals.append(goal)
+                    elif goals[-1] != goal:
+                        return False, f"deduction theorem: {deduction.group(1)} is not the current goal"
+                    if self.terms_[goal] != ('>', hypothesis, rest):
+                        return False, f"deduction theorem: {deduction.group(1)} is not {deduction.group(2)}>{deduction.group(3)}"
+                    hypotheses.append(hypothesis)
+                    goals.append(rest)
+                    continue
+                change = CHANGE.match(line)
+                if change:
+                    changed = self.parse(change.group(1))
+                    continue
+                assignment = BINDING.match(line)
+                if assignment and changed is not None:
+                    binding[assignment.group(1)] = self.parse(assignment.group(2))
+                    continue
+                result = PROVED.match(line)
+                if result:
+                    proved = self.parse(result.group(1))
+                    continue
+                match = STEP.match(line)
+                if not match:
+                    continue
+                number = int(match.group(1))
+                if number == 1:
+                    lines.clear()
+                    used.clear()
+                if number != len(lines) + 1:
+                    return False, f"step {number}: expected step {len(lines) + 1}"
+                formula = self.parse(match.group(3))
+                refs = [int(ref) for ref in match.group(2).replace(' ', '').split(',') if ref]
+                if not refs:
+                    if formula in hypotheses:
+                        used.add(formula)
+                    elif not self.is_axiom_instance(formula):
+                        return False, f"step {number}: {match.group(3)} is neither an axiom nor a hypothesis"
+                elif len(refs) != 2 or any(ref < 1 or ref >= number for ref in refs):
+                    return False, f"step {number}: invalid references {match.group(2)}"
+                elif not self.is_consequence(lines[refs[0]], lines[refs[1]], formula):
+                    return False, f"step {number}: {match.group(3)} does not follow from steps {refs[0]} and {refs[1]}"
+                lines[number] = formula
+                steps += 1
+        except ValueError as error:
+            return False, str(error)
+        if not steps:
+            return False, "no proof steps"
+        last = lines[len(lines)]
+        if changed is not None:
+            if changed != last:
+                return False, f"change variables: {self.to_string(changed)} is not the last step"
+            last = self.substitute(last, binding, {})
+        if proved is not None and proved != last:
+            return False, f"proved: {self.to_string(proved)} is not what the steps prove"
+        if goals:
+            # the goal reached must not need the hypotheses of the goals after it
+            reached = [i for i, goal in enumerate(goals) if goal == last and used <= set(hypotheses[:i])]
+            if not reached:
+                return False, f"the proof ends with {self.to_string(last)}, which is not the goal"
+        return True, f"{steps} steps verified"
+
+    def check_many(self, texts: Iterable[str], targets: Optional[Iterable[str]] = None) -> List[Tuple[bool, str]]:
+        # the interning table and the axiom instance cache are shared by the whole batch
+        if targets is None:
+            return [self.check(text) for text in texts]
+        return [self.check(text, target) for text, target in zip(texts, targets)]
+
+
+def main():
+    checker = ProofChecker()
+    failed = 0
+    for path in sys.argv[1:]:
+        with open(path) as file:
+            ok, message = checker.check(file.read())
+        failed += not ok
+        print(f"{path}: {'ok' if ok else 'FAILED'}: {message}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
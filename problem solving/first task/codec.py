@@ -0,0 +1,156 @@
+from typing import List, Tuple, Iterable, Iterator, Union
+from constructor import Expression, Term, Relation, Node, Operation, INVALID_INDEX
+
+# format: b'EX', version, varint count of formulas, then for every formula a varint count of nodes
+# and the nodes in preorder: a tag byte (kind << 4 | op) followed by a zigzag varint value for leaves
+MAGIC = b'EX'
+VERSION = 1
+
+KINDS = ['Function', 'Variable', 'Constant']
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(view: memoryview, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(view):
+            raise ValueError("Truncated varint")
+        byte = view[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def preorder(expression: Expression) -> Iterator[Tuple[int, int]]:
+    # (tag, value) for every node, the tag is kind << 4 | op and the value is 0 for functions
+    if expression.empty():
+        return
+    stack = [0]
+    while stack:
+        idx = stack.pop()
+        term = expression[idx]
+        if term.type not in KIND_CODES:
+            raise ValueError(f"Term of type {term.type} can not be encoded")
+        if term.type != 'Function':
+            yield KIND_CODES[term.type] << 4 | term.op.value, term.value
+            continue
+        yield KIND_CODES[term.type] << 4 | term.op.value, 0
+        rel = expression.subtree(idx)
+        stack.append(rel.right())
+        stack.append(rel.left())
+
+
+def assemble(terms: Iterable[Tuple[int, int]]) -> Expression:
+    # nodes are created in preorder, the same layout subtree_copy produces
+    nodes: List[Node] = []
+    pending = []
+    for idx, (tag, value) in enumerate(terms):
+        if tag >> 4 >= len(KINDS):
+            raise ValueError(f"Unknown term kind {tag >> 4}")
+        kind = KINDS[tag >> 4]
+        parent = pending[-1] if pending else INVALID_INDEX
+        if parent != INVALID_INDEX:
+            refs = nodes[parent].rel.refs
+            if refs[1] == INVALID_INDEX:
+                refs[1] = idx
+            else:
+                refs[2] = idx
+                pending.pop()
+        elif idx:
+            raise ValueError("Expression has more than one root")
+        nodes.append(Node(Term(kind, Operation(tag & 0x0f), value), Relation(idx, INVALID_INDEX, INVALID_INDEX, parent)))
+        if kind == 'Function':
+            pending.append(idx)
+    if pending:
+        raise ValueError("Truncated expression")
+    return Expression(nodes)
+
+
+def encode_into(out: bytearray, expression: Expression):
+    write_varint(out, len(expression))
+    for tag, value in preorder(expression):
+        out.append(tag)
+        if tag >> 4 != KIND_CODES['Function']:
+            write_varint(out, zigzag(value))
+
+
+def decode_from(view: memoryview, pos: int) -> Tuple[Expression, int]:
+    count, pos = read_varint(view, pos)
+
+    def terms() -> Iterator[Tuple[int, int]]:
+        nonlocal pos
+        for _ in range(count):
+            if pos >= len(view):
+                raise ValueError("Truncated expression")
+            tag = view[pos]
+            pos += 1
+            value = 0
+            if tag >> 4 != KIND_CODES['Function']:
+                value, pos = read_varint(view, pos)
+                value = unzigzag(value)
+            yield tag, value
+
+    expression = assemble(terms())
+    return expression, pos
+
+
+def header(view: memoryview) -> int:
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not an encoded expression")
+    if len(view) <= len(MAGIC) or view[len(MAGIC)] != VERSION:
+        raise ValueError(f"Unsupported encoding version, expected {VERSION}")
+    return len(MAGIC) + 1
+
+
+def encode_many(expressions: Iterable[Expression]) -> bytes:
+    expressions = list(expressions)
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    write_varint(out, len(expressions))
+    for expression in expressions:
+        encode_into(out, expression)
+    return bytes(out)
+
+
+def decode_many(data: Buffer) -> List[Expression]:
+    view = memoryview(data)
+    pos = header(view)
+    count, pos = read_varint(view, pos)
+    result = []
+    for _ in range(count):
+        expression, pos = decode_from(view, pos)
+        result.append(expression)
+    if pos != len(view):
+        raise ValueError("Trailing bytes after the last expression")
+    return result
+
+
+def encode(expression: Expression) -> bytes:
+    return encode_many([expression])
+
+
+def decode(data: Buffer) -> Expression:
+    result = decode_many(data)
+    if len(result) != 1:
+        raise ValueError(f"Expected one expression, found {len(result)}")
+    return result[0]
@@ -0,0 +1,152 @@
+from typing import List, Dict, Tuple, Generator
+from checker import ProofChecker, STEP
+from lemmas import Lemmas
+from proof import finish
+
+LEMMAS = ['identity', 'ex_falso', 'contraposition', 'negated_implication', 'cases',
+          'syllogism', 'conjunction_left', 'conjunction_right', 'conjunction']
+
+
+class ProofCompressor:
+    def __init__(self, lemmas: List[str] = LEMMAS):
+        self.checker_ = ProofChecker()
+        self.alpha_: Dict[int, int] = {}
+        self.lemmas_: List[Tuple[int, List[Tuple[int, Tuple[int, ...]]]]] = []
+        for name in lemmas:
+            proof, conclusion = Lemmas.get(name)
+            order = proof.ancestors(conclusion)
+            position = {idx: i for i, idx in enumerate(order)}
+            lines = [(self.checker_.parse(proof[idx].to_string()),
+                      tuple(position[ref] for ref in proof.refs_[idx])) for idx in order]
+            self.lemmas_.append((lines[-1][0], lines))
+        self.lemmas_.sort(key=lambda lemma: len(lemma[1]))
+
+    def alpha(self, idx: int) -> int:
+        # renames the variables in order of appearance, alpha-equivalent formulas get the same id
+        if idx in self.alpha_:
+            return self.alpha_[idx]
+        checker = self.checker_
+        names = {}
+
+        def rename(current: int) -> int:
+            term = checker.terms_[current]
+            if term[0] == 'V':
+                return checker.intern(('V', names.setdefault(term[1], len(names)), term[2]))
+            if term[0] == 'C':
+                return current
+            return checker.intern((term[0], rename(term[1]), rename(term[2])))
+
+        self.alpha_[idx] = rename(idx)
+        return self.alpha_[idx]
+
+    def order(self, steps: List[Tuple[int, Tuple[int, ...]]], conclusion: int) -> List[int]:
+        # premises first; a formula is kept only once, by the step that is emitted first
+        result = []
+        emitted = set()
+        visited = set()
+        stack = [(conclusion, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                if steps[node][0] not in emitted:
+                    emitted.add(steps[node][0])
+                    result.append(node)
+                continue
+            if node in visited:
+                continue
+            visited.add(node)
+            stack.append((node, True))
+            for ref in reversed(steps[node][1]):
+                stack.append((ref, False))
+        return result
+
+    def instantiate(self, idx: int, binding: Dict[object, int], memo: Dict[int, int]) -> int:
+        # unlike ProofChecker.substitute the values are not resolved again, they may share names with the lemma
+        if idx in memo:
+            return memo[idx]
+        checker = self.checker_
+        term = checker.terms_[idx]
+        if term[0] == 'V' and term[1] in binding:
+            result = checker.negate(binding[term[1]]) if term[2] else binding[term[1]]
+        elif checker.is_leaf(idx):
+            result = idx
+        else:
+            result = checker.intern((term[0], self.instantiate(term[1], binding, memo),
+                                     self.instantiate(term[2], binding, memo)))
+        memo[idx] = result
+        return result
+
+    def shortcut(self, steps: List[Tuple[int, Tuple[int, ...]]], node: int) -> Tuple[int, Tuple[int, ...]]:
+        # derives the formula of the node from a lemma, appending the instantiated lemma lines
+        checker = self.checker_
+        formula = steps[node][0]
+        for conclusion, lines in self.lemmas_:
+            binding = {}
+            if not checker.matches(conclusion, formula, binding):
+                continue
+            offset = len(steps)
+            memo = {}
+            for line, refs in lines[:-1]:
+                steps.append((self.instantiate(line, binding, memo), tuple(offset + ref for ref in refs)))
+            return formula, tuple(offset + ref for ref in lines[-1][1])
+        return steps[node]
+
+    def compress(self, text: str) -> str:
+        return finish(self.compressing(text))
+
+    def compressing(self, text: str) -> Generator[None, None, str]:
+        # compress() that yields after every line read and every step shortened
+        checker = self.checker_
+        steps: List[Tuple[int, Tuple[int, ...]]] = []
+        representative: Dict[int, int] = {}
+        for line in text.splitlines():
+            yield
+            match = STEP.match(line)
+            if not match:
+                continue
+            refs = tuple(int(ref) - 1 for ref in match.group(2).replace(' ', '').split(',') if ref)
+            formula = checker.parse(match.group(3))
+            # later alpha-equivalent lines are replaced by the first one
+            node = representative.setdefault(self.alpha(formula), len(steps))
+            steps.append((formula, tuple(representative[self.alpha(steps[ref][0])] for ref in refs)))
+            if node != len(steps) - 1:
+                steps[-1] = steps[node]
+        if not steps:
+            return text
+        # the conclusion keeps its own variable names, the lines after it refer to them
+        conclusion = len(steps) - 1
+        steps[conclusion] = (formula, steps[conclusion][1])
+        for node in range(conclusion + 1):
+            yield
+            if not steps[node][1]:
+                continue
+            if checker.is_axiom_instance(steps[node][0]):
+                steps[node] = (steps[node][0], ())
+                continue
+            original = steps[node]
+            appended = len(steps)
+            candidate = self.shortcut(steps, node)
+            if candidate is original:
+                continue
+            size = len(self.order(steps, conclusion))
+            steps[node] = candidate
+            if len(self.order(steps, conclusion)) >= size:
+                steps[node] = original
+                del steps[appended:]
+        numbers = {}
+        out = []
+        for node in self.order(steps, conclusion):
+            formula, refs = steps[node]
+            numbers[formula] = len(numbers) + 1
+            premises = ','.join(str(numbers[steps[ref][0]]) for ref in refs)
+            out.append(f"{numbers[formula]}. step({premises}): {checker.to_string(formula)}\n")
+        return ''.join(out)
+
+
+def compressing(text: str) -> Generator[None, None, str]:
+    # a compressor per proof: its tables grow with every formula parsed, and the service compresses in many threads
+    return (yield from ProofCompressor().compressing(text))
+
+
+def compress(text: str) -> str:
+    return finish(compressing(text))
@@ -1,19 +1,12 @@
-from enum import Enum, auto
 import sys
 import re
+import itertools
 from typing import List, Dict, Tuple, Union
-from parser import ExpressionParser
+from parser import ExpressionParser, Operation
 
 INVALID_INDEX = -1
-
-class Operation(Enum):
-    NOP = auto()
-    NEGATION = auto()
-    IMPLICATION = auto()
-    DISJUNCTION = auto()
-    CONJUNCTION = auto()
-    XOR = auto()
-    EQUIVALENT = auto()
+# canonicalize() tries both orders of at most this many pairs of operands with equal keys
+MAX_TIES = 8
 
 def priority(op: Operation) -> int:
     priorities = {
@@ -78,6 +71,9 @@ class Term:
                 result += suitable_constant
             return result
 
+    def copy(self) -> 'Term':
+        return Term(self.type, self.op, self.value)
+
     def __eq__(self, other):
         return (self.type == other.type and
                 self.op == other.op and
@@ -112,13 +108,14 @@ class Expression:
             pass
         elif isinstance(expression, str):
             parser = ExpressionParser(expression)
-            self.nodes = parser.parse().nodes
+            self.nodes = [Node(Term(node.term.type, node.term.op, node.term.value), Relation(*node.rel.refs))
+                          for node in parser.parse().nodes]
         elif isinstance(expression, Term):
             self.nodes.append(Node(expression, Relation(0)))
         elif isinstance(expression, list):
             self.nodes = expression
         elif isinstance(expression, Expression):
-            self.nodes = expression.nodes.copy()
+            self.nodes = [Node(node.term.copy(), Relation(*node.rel.refs)) for node in expression.nodes]
         else:
             raise TypeError("Invalid type for Expression initialization")
 
@@ -205,6 +202,54 @@ class Expression:
                 continue
             node.term.value = remapping[node.term.value]
 
+    def canonicalize(self):
+        # orders the operands of commutative connectives by a key that does not depend on the names of the
+        # variables: a variable is known by its polarity and its number of occurrences. Operands with equal
+        # keys may still share variables differently, so both of their orders are tried and the smallest
+        # text after renaming wins, which makes the result the same for every renaming of the variables
+        if self.empty():
+            return
+        counts: Dict[int, int] = {}
+        for node in self.nodes:
+            if node.term.type == 'Variable':
+                counts[node.term.value] = counts.get(node.term.value, 0) + 1
+        ties = []
+
+        def order(idx):
+            term = self.nodes[idx].term
+            if term.type == 'Constant':
+                return 0, 1, term.op.value, term.value
+            if term.type == 'Variable':
+                return 0, 0, term.op.value, -counts[term.value]
+            rel = self.nodes[idx].rel
+            left = order(rel.left())
+            right = order(rel.right())
+            if is_commutative(term.op):
+                if right < left:
+                    rel.refs[1], rel.refs[2] = rel.refs[2], rel.refs[1]
+                    left, right = right, left
+                elif left == right:
+                    ties.append(idx)
+            return 1, term.op.value, left, right
+
+        def arranged(flips) -> 'Expression':
+            result = Expression(self)
+            for idx, flip in zip(ties, flips):
+                if flip:
+                    refs = result.nodes[idx].rel.refs
+                    refs[1], refs[2] = refs[2], refs[1]
+            result.nodes = result.subtree_copy(0).nodes
+            result.normalize()
+            return result
+
+        order(0)
+        del ties[MAX_TIES:]
+        if not ties:
+            self.nodes = arranged(()).nodes
+            return
+        candidates = (arranged(flips) for flips in itertools.product((False, True), repeat=len(ties)))
+        self.nodes = min(candidates, key=lambda candidate: candidate.to_string()).nodes
+
     def standardize(self):
         from collections import deque
         q = deque()
@@ -242,7 +287,8 @@ class Expression:
             nonlocal i
             if node.self() == INVALID_INDEX:
                 return
-            nodes.append(self.nodes[node.self()])
+            original = self.nodes[node.self()]
+            nodes.append(Node(original.term.copy(), Relation(*original.rel.refs)))
             remapping[node.self()] = i
             i += 1
             traverse(self.subtree(node.left()))
@@ -285,10 +331,11 @@ class Expression:
                     Operation.NOP if self.nodes[node_idx].term.op == Operation.NEGATION else Operation.NEGATION
                 )
                 continue
-            self.nodes[node_idx].term.op = opposite(self.nodes[node_idx].term.op)
-            if self.nodes[node_idx].term.op in {Operation.IMPLICATION, Operation.CONJUNCTION}:
+            op = self.nodes[node_idx].term.op
+            self.nodes[node_idx].term.op = opposite(op)
+            if op in {Operation.IMPLICATION, Operation.CONJUNCTION}:
                 q.append(self.subtree(node_idx).right())
-            elif self.nodes[node_idx].term.op == Operation.DISJUNCTION:
+            elif op == Operation.DISJUNCTION:
                 q.append(self.subtree(node_idx).left())
                 q.append(self.subtree(node_idx).right())
 
@@ -320,7 +367,7 @@ class Expression:
         for entry in indices:
             replacement = new_expr_neg if self.nodes[entry].term.op == Operation.NEGATION else new_expr
             self.nodes[entry] = Node(
-                replacement.nodes[0].term,
+                replacement.nodes[0].term.copy(),
                 Relation(
                     self.nodes[entry].rel.refs[0],
                     increase_index(replacement.subtree(0).left(), offset - 1),
@@ -330,7 +377,7 @@ class Expression:
             )
             for i in range(1, len(replacement.nodes)):
                 node_copy = Node(
-                    replacement.nodes[i].term,
+                    replacement.nodes[i].term.copy(),
                     Relation(*[increase_index(ref, offset - 1) for ref in replacement.nodes[i].rel.refs])
                 )
                 self.nodes.append(node_copy)
@@ -352,14 +399,14 @@ class Expression:
         ))
 
         for node in lhs.nodes:
-            node_copy = Node(node.term, Relation(*[increase_index(ref, offset) for ref in node.rel.refs]))
+            node_copy = Node(node.term.copy(), Relation(*[increase_index(ref, offset) for ref in node.rel.refs]))
             if node_copy.rel.refs[3] == INVALID_INDEX:
                 node_copy.rel.refs[3] = 0
             expression.nodes.append(node_copy)
 
         offset += len(lhs)
         for node in rhs.nodes:
-            node_copy = Node(node.term, Relation(*[increase_index(ref, offset) for ref in node.rel.refs]))
+            node_copy = Node(node.term.copy(), Relation(*[increase_index(ref, offset) for ref in node.rel.refs]))
             if node_copy.rel.refs[3] == INVALID_INDEX:
                 node_copy.rel.refs[3] = 0
             expression.nodes.append(node_copy)
@@ -0,0 +1,333 @@
+import sys
+import json
+import zlib
+import socket
+import struct
+import argparse
+import multiprocessing
+from typing import List, Tuple, Iterator, Generator, Optional
+from constructor import Expression
+from algorithm import Solver, canonical_form
+from modus_ponens import modus_ponens
+from matcher import matcher, detach
+from rules import DERIVED_RULES
+from codec import encode_many, decode_many
+from arena import FormulaArena, ArenaPool
+from main import AXIOMS
+
+# a message is two lengths, a JSON header and a batch of formulas in the codec format:
+#   {'type': 'config', 'max_len', 'base', 'shard', 'shards', 'rules'}
+#   {'type': 'batch', 'owners'} with the new formulas -> {'type': 'results', 'results': [[tag, premises, key], ...]}
+#       with the conclusions; the premises are positions in the order of the broadcast formulas, which is the
+#       order of Solver.axioms_ on the coordinator, and sorting by the keys gives the order in which
+#       Solver itself would produce the conclusions, so the search does not depend on the number of shards
+#   {'type': 'stop'}
+FRAME = struct.Struct('!II')
+
+
+def receive_exactly(sock: socket.socket, size: int) -> memoryview:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Connection closed in the middle of a message")
+        received += count
+    return view
+
+
+def send_message(sock: socket.socket, header: dict, formulas: List[Expression] = ()):
+    head = json.dumps(header).encode()
+    payload = encode_many(formulas)
+    sock.sendall(FRAME.pack(len(head), len(payload)) + head + payload)
+
+
+def receive_message(sock: socket.socket) -> Tuple[dict, List[Expression]]:
+    head_size, payload_size = FRAME.unpack(receive_exactly(sock, FRAME.size))
+    header = json.loads(bytes(receive_exactly(sock, head_size)))
+    return header, decode_many(receive_exactly(sock, payload_size))
+
+
+class ShardWorker:
+    # owns every formula whose owner is this shard and pairs it with the formulas broadcast after it
+    def __init__(self):
+        self.shard_: List[Tuple[int, Expression]] = []
+        self.base_: List[Expression] = []
+        self.rules_ = []
+        self.max_len_ = 0
+        self.base_size_ = 0
+        self.index_ = 0
+        self.seen_ = 0
+
+    def configure(self, header: dict):
+        self.shard_.clear()
+        self.base_.clear()
+        self.seen_ = 0
+        self.max_len_ = header['max_len']
+        self.base_size_ = header['base']
+        self.index_ = header['shard']
+        self.rules_ = [rule for rule in DERIVED_RULES if rule.name in header['rules']]
+
+    def fits(self, expression: Expression) -> bool:
+        return not expression.empty() and 2 * self.max_len_ >= len(expression)
+
+    def detach(self, minor: Expression, major: int, expression: Expression) -> Expression:
+        if major < self.base_size_:
+            return detach(minor, expression, matcher(expression))
+        return modus_ponens(minor, expression)
+
+    def pairs(self, newest: Expression, position: int, owner: bool) -> Iterator[Tuple[str, List[int], Expression, list]]:
+        # the same pairs Solver.apply_rules and Solver.generate make, split between the owners of the older formulas
+        for index, other in self.shard_:
+            yield 'mp', [index, position], modus_ponens(other, newest), [position, 1, index, 0]
+            yield 'mp', [position, index], self.detach(newest, index, other), [position, 1, index, 1]
+        if not owner:
+            return
+        yield 'mp', [position, position], modus_ponens(newest, newest), [position, 1, position, 0]
+        base = list(enumerate(self.base_[:min(self.base_size_, position)]))
+        counter = 0
+        for rule in self.rules_:
+            if rule.arity == 1:
+                candidates = [[(position, newest)]]
+            else:
+                candidates = [[other, (position, newest)] for other in base] + \
+                             [[(position, newest), other] for other in base]
+            for premises in candidates:
+                yield rule.name, [index for index, _ in premises], \
+                    rule.apply([premise for _, premise in premises]), [position, 0, counter, 0]
+                counter += 1
+
+    def batch(self, owners: List[int], formulas: List[Expression]) -> Tuple[dict, List[Expression]]:
+        results = []
+        payload = []
+        for owner, newest in zip(owners, formulas):
+            position = self.seen_
+            self.seen_ += 1
+            if position < self.base_size_:
+                self.base_.append(newest)
+            for tag, premises, conclusion, key in self.pairs(newest, position, owner == self.index_):
+                if self.fits(conclusion):
+                    results.append([tag, premises, key])
+                    payload.append(conclusion)
+            if owner == self.index_:
+                self.shard_.append((position, newest))
+        return {'type': 'results', 'results': results}, payload
+
+    def serve(self, sock: socket.socket):
+        while True:
+            try:
+                header, formulas = receive_message(sock)
+            except ConnectionError:
+                return
+            if header['type'] == 'stop':
+                return
+            if header['type'] == 'config':
+                self.configure(header)
+            elif header['type'] == 'batch':
+                send_message(sock, *self.batch(header['owners'], formulas))
+            else:
+                raise ValueError(f"Unknown message {header['type']}")
+
+
+def run_worker(host: str, port: int, ready=None, once: bool = False):
+    with socket.create_server((host, port)) as server:
+        if ready is not None:
+            ready.put(server.getsockname()[1])
+        while True:
+            connection, _ = server.accept()
+            with connection:
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                ShardWorker().serve(connection)
+            if once:
+                return
+
+
+def start_local_workers(count: int) -> Tuple[List[multiprocessing.Process], List[Tuple[str, int]]]:
+    ready = multiprocessing.Queue()
+    processes = []
+    for _ in range(count):
+        process = multiprocessing.Process(target=run_worker, args=('127.0.0.1', 0, ready, True), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes, [('127.0.0.1', ready.get()) for _ in range(count)]
+
+
+class DistributedSolver(Solver):
+    # the coordinator keeps the global set of known formulas and checks the target,
+    # the workers compute the conclusions of the new formulas with the formulas of their shards
+    def __init__(self, axioms: List[Expression], target: Expression, time_limit_ms: int,
+                 workers: List[Tuple[str, int]], rules=(), **kwargs):
+        super().__init__(axioms, target, time_limit_ms, rules, lazy=False, skeleton_depth=None, **kwargs)
+        self.rules_by_name_ = {rule.name: rule for rule in self.rules_}
+        self.sockets_ = []
+        for host, port in workers:
+            sock = socket.create_connection((host, port))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sockets_.append(sock)
+        if not self.sockets_:
+            raise ValueError("At least one worker is required")
+        self.configured_ = False
+
+    def configure(self, max_len: int):
+        for shard, sock in enumerate(self.sockets_):
+            send_message(sock, {'type': 'config', 'max_len': max_len, 'base': self.base_, 'shard': shard,
+                                'shards': len(self.sockets_), 'rules': list(self.rules_by_name_)})
+        self.configured_ = True
+
+    def owner(self, expression: Expression) -> int:
+        return zlib.crc32(canonical_form(expression).encode()) % len(self.sockets_)
+
+    def distribute(self, formulas: List[Expression], max_len: int) -> bool:
+        if not self.configured_:
+            self.configure(max_len)
+        owners = [self.owner(expression) for expression in formulas]
+        for sock in self.sockets_:
+            send_message(sock, {'type': 'batch', 'owners': owners}, formulas)
+        results = []
+        for sock in self.sockets_:
+            header, payload = receive_message(sock)
+            for (tag, premises, key), conclusion in zip(header['results'], payload):
+                results.append((key, tag, conclusion, premises))
+        results.sort(key=lambda result: result[0])
+        for _, tag, conclusion, indices in results:
+            if not self.add_produced(conclusion, max_len):
+                continue
+            premises = [self.axioms_[index] for index in indices]
+            if tag == 'mp':
+                self.dump_.write(f"{conclusion} mp {premises[0]} {premises[1]}\n")
+            else:
+                self.record_macro(self.rules_by_name_[tag], premises, conclusion)
+            if self.is_target_proved_by(conclusion):
+                self.add_expression(conclusion, max_len)
+                return True
+        return False
+
+    def insert(self, batches: Iterator[List[Expression]], max_len: int) -> Generator[None, None, bool]:
+        # the pairs are formed by the workers, the search yields once per batch sent to them
+        for batch in batches:
+            yield
+            fresh = []
+            for expression in batch:
+                if self.expired():
+                    break
+                self.count('formulas.added')
+                if not self.add_expression(expression, max_len):
+                    continue
+                if self.is_target_proved_by(expression):
+                    return True
+                fresh.append(expression)
+            if fresh and self.distribute(fresh, max_len):
+                return True
+            if self.expired():
+                return False
+        return False
+
+    def close(self):
+        for sock in self.sockets_:
+            try:
+                send_message(sock, {'type': 'stop'})
+            except OSError:
+                pass
+            sock.close()
+        self.sockets_.clear()
+
+
+class ArenaSolver(Solver):
+    # the known formulas are copied into a shared arena once, the processes of the pool read them in place
+    # and compute modus ponens of every new formula with the formulas before it
+    def __init__(self, axioms: List[Expression], target: Expression, time_limit_ms: int,
+                 processes: Optional[int] = None, rules=(), capacity: int = 1 << 22, **kwargs):
+        super().__init__(axioms, target, time_limit_ms, rules, lazy=False, skeleton_depth=None, **kwargs)
+        self.arena_ = FormulaArena(capacity)
+        self.offsets_: List[int] = []
+        self.pool_ = ArenaPool(self.arena_, processes)
+
+    def insert(self, batches: Iterator[List[Expression]], max_len: int) -> Generator[None, None, bool]:
+        # the pairs of a whole batch go to the pool at once, the search yields once per batch
+        for batch in batches:
+            yield
+            pairs = []
+            for expression in batch:
+                if self.expired():
+                    break
+                self.count('formulas.added')
+                if not self.add_expression(expression, max_len):
+                    continue
+                if self.is_target_proved_by(expression):
+                    return True
+                if (yield from self.apply_rules(max_len)):
+                    return True
+                newest = len(self.axioms_) - 1
+                self.offsets_.append(self.arena_.append(expression))
+                for j in range(newest + 1):
+                    pairs.append((j, newest))
+                    if j != newest:
+                        pairs.append((newest, j))
+            conclusions = self.pool_.detach([(self.offsets_[minor], self.offsets_[major]) for minor, major in pairs])
+            for (minor, major), conclusion in zip(pairs, conclusions):
+                if self.add_produced(conclusion, max_len):
+                    self.dump_.write(f"{conclusion} mp {self.axioms_[minor]} {self.axioms_[major]}\n")
+                if self.is_target_proved_by(conclusion):
+                    self.add_expression(conclusion, max_len)
+                    return True
+            if self.expired():
+                return False
+        return False
+
+    def close(self):
+        self.pool_.close()
+        self.arena_.close()
+        self.arena_.unlink()
+
+
+def parse_address(text: str) -> Tuple[str, int]:
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Saturation sharded between worker processes over TCP")
+    commands = parser.add_subparsers(dest='command', required=True)
+    worker = commands.add_parser('worker', help="serve one shard")
+    worker.add_argument('--host', default='127.0.0.1')
+    worker.add_argument('--port', type=int, required=True)
+    coordinator = commands.add_parser('coordinator', help="prove the formula read from stdin")
+    coordinator.add_argument('--workers', help="comma separated host:port list")
+    coordinator.add_argument('--local', type=int, default=0, help="start this many workers on this machine")
+    coordinator.add_argument('--processes', type=int,
+                             help="instead of workers, this many local processes reading the formulas from shared memory")
+    coordinator.add_argument('--time-limit', type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        run_worker(args.host, args.port)
+        return 0
+
+    processes: List[multiprocessing.Process] = []
+    if args.processes is not None and (args.workers or args.local):
+        parser.error("--processes replaces the workers")
+    addresses = [parse_address(address) for address in args.workers.split(',')] if args.workers else []
+    if args.local:
+        processes, local = start_local_workers(args.local)
+        addresses += local
+    target = Expression(input())
+    target.standardize()
+    target.make_permanent()
+    axioms = [Expression(axiom) for axiom in AXIOMS]
+    if args.processes is not None:
+        solver = ArenaSolver(axioms, target, args.time_limit, args.processes, DERIVED_RULES)
+    else:
+        solver = DistributedSolver(axioms, target, args.time_limit, addresses, DERIVED_RULES)
+    try:
+        solver.solve()
+    finally:
+        solver.close()
+        for process in processes:
+            process.join()
+    print(solver.thought_chain())
+    return 0 if solver.proved_ else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,104 +1,126 @@
+from typing import Dict, Tuple
+from constructor import Expression, Term, Operation
+
+def occurs(value: int, expression: Expression, sub: Dict[int, Expression]) -> bool:
+    # follows the bindings transitively, so a chain of variables cannot hide a cycle
+    stack = expression.variables()
+    seen = set()
+    while stack:
+        var = stack.pop()
+        if var == value:
+            return True
+        if var in seen:
+            continue
+        seen.add(var)
+        if var in sub:
+            stack.extend(sub[var].variables())
+    return False
+
 def add_constraint(term: Term, substitution: Expression, sub: Dict[int, Expression]) -> bool:
-    if substitution[0].type == 'Function' and substitution.contains(term):
+    if substitution[0].type == 'Function' and occurs(term.value, substitution, sub):
         return False
     sub[term.value] = substitution
     return True
 
-def unification(left: Expression, right: Expression, substitution: Dict[int, Expression]) -> bool:
+# a term of a formula without copying it: the formula, the index of the subterm and the offset added to
+# its variables, so the premises are renamed apart virtually and never modified
+View = Tuple[Expression, int, int]
+
+
+def key(view: View) -> int:
+    expression, idx, offset = view
+    return expression[idx].value + offset
+
+
+def materialize(view: View, negate=False) -> Expression:
+    expression, idx, offset = view
+    result = expression.subtree_copy(idx)
+    if offset:
+        for node in result.nodes:
+            if node.term.type == 'Variable':
+                node.term.value += offset
+    if negate:
+        result.negation()
+    return result
+
+
+def dereference(view: View, sub: Dict[int, Expression]) -> View:
+    while view[0][view[1]].type == 'Variable' and key(view) in sub:
+        bound = sub[key(view)]
+        if view[0][view[1]].op == Operation.NEGATION:
+            bound = Expression(bound)
+            bound.negation()
+        view = (bound, 0, 0)
+    return view
+
+def resolve(value: int, sub: Dict[int, Expression], resolved: Dict[int, Expression], visiting=()) -> bool:
+    # substitutes bound variables until none are left, a cycle is a failed occurs check
+    if value in resolved:
+        return True
+    expression = Expression(sub[value])
+    for var in set(expression.variables()):
+        if var not in sub:
+            continue
+        if var == value or var in visiting:
+            return False
+        if not resolve(var, sub, resolved, (*visiting, value)):
+            return False
+        expression.replace(var, resolved[var])
+    resolved[value] = expression
+    return True
+
+def failed(stats, reason: str) -> bool:
+    if stats is not None:
+        stats.count(f"unification.failed.{reason}")
+    return False
+
+def unification(left: Expression, right: Expression, substitution: Dict[int, Expression],
+                rename=True, limit=None, stats=None, right_idx=0, offset=None) -> bool:
+    # the variables of the subterm right_idx of right are taken as shifted by offset, by default the
+    # smallest one goes just above the variables of left when renaming; the bindings are in these variables
     sub = {}
-    right.change_variables(left.max_value() + 1)
-    v = right.max_value() + 1
+    if offset is None:
+        offset = left.max_value() + 1 - right.min_value() if rename else 0
+    # bindings can unfold into exponentially large terms, such unifiers are given up
+    budget = limit if limit is not None else 8 * (len(left) + len(right))
     from collections import deque
     expression = deque()
-    expression.append((left.subtree(0).self(), right.subtree(0).self()))
+    expression.append(((left, 0, 0), (right, right_idx, offset)))
     while expression:
-        left_idx, right_idx = expression.popleft()
-        left_term = left[left_idx]
-        right_term = right[right_idx]
-        if left_term.type == 'Function' and right_term.type == 'Function':
-            if left_term.op != right_term.op:
-                return False
-            expression.append((left.subtree(left_idx).left(), right.subtree(right_idx).left()))
-            expression.append((left.subtree(left_idx).right(), right.subtree(right_idx).right()))
-            continue
-        lhs = left.subtree_copy(left_idx)
-        rhs = right.subtree_copy(right_idx)
-        while lhs[0].type == 'Variable' and lhs[0].value in sub:
-            should_negate = lhs[0].op == Operation.NEGATION
-            lhs = sub[lhs[0].value]
-            if should_negate:
-                lhs.negation()
-        while rhs[0].type == 'Variable' and rhs[0].value in sub:
-            should_negate = rhs[0].op == Operation.NEGATION
-            rhs = sub[rhs[0].value]
-            if should_negate:
-                rhs.negation()
-        if lhs[0].type == 'Constant' and rhs[0].type == 'Constant':
-            if lhs[0] != rhs[0]:
-                return False
+        budget -= 1
+        if budget < 0:
+            return failed(stats, 'budget')
+        lhs, rhs = expression.popleft()
+        lhs = dereference(lhs, sub)
+        rhs = dereference(rhs, sub)
+        l_term, r_term = lhs[0][lhs[1]], rhs[0][rhs[1]]
+        if l_term.type == 'Function' and r_term.type == 'Function':
+            if l_term.op != r_term.op:
+                return failed(stats, 'operation')
+            l_rel, r_rel = lhs[0].subtree(lhs[1]), rhs[0].subtree(rhs[1])
+            expression.append(((lhs[0], l_rel.left(), lhs[2]), (rhs[0], r_rel.left(), rhs[2])))
+            expression.append(((lhs[0], l_rel.right(), lhs[2]), (rhs[0], r_rel.right(), rhs[2])))
             continue
-        if lhs[0].type == 'Constant' and rhs[0].type == 'Variable':
-            if rhs[0].op == Operation.NEGATION:
-                lhs[0].op = Operation.NEGATION if lhs[0].op != Operation.NEGATION else Operation.NOP
-            if not add_constraint(rhs[0], lhs, sub):
-                return False
-            continue
-        if lhs[0].type == 'Variable' and rhs[0].type == 'Constant':
-            if lhs[0].op == Operation.NEGATION:
-                rhs[0].op = Operation.NEGATION if rhs[0].op != Operation.NEGATION else Operation.NOP
-            if not add_constraint(lhs[0], rhs, sub):
-                return False
-            continue
-        if lhs[0].type == 'Variable' and rhs[0].type == 'Variable':
-            if lhs[0].value == rhs[0].value:
-                if lhs[0].op != rhs[0].op:
-                    return False
+        if l_term.type != 'Variable' and r_term.type == 'Variable':
+            lhs, rhs = rhs, lhs
+            l_term, r_term = r_term, l_term
+        if l_term.type == 'Variable':
+            if r_term.type == 'Variable' and key(rhs) == key(lhs):
+                if l_term.op != r_term.op:
+                    return failed(stats, 'polarity')
                 continue
-            expr = Expression(Term('Variable', Operation.NEGATION if lhs[0].op == Operation.NEGATION or rhs[0].op == Operation.NEGATION else Operation.NOP, v))
-            v += 1
-            neg_expr = expr.subtree_copy(0)
-            neg_expr.negation()
-            if lhs[0].op == Operation.NEGATION:
-                add_constraint(lhs[0], neg_expr, sub)
-            else:
-                add_constraint(lhs[0], expr, sub)
-            if rhs[0].op == Operation.NEGATION:
-                add_constraint(rhs[0], neg_expr, sub)
-            else:
-                add_constraint(rhs[0], expr, sub)
-            continue
-        if lhs[0].type == 'Function':
-            if rhs[0].type != 'Variable':
-                return False
-            if rhs[0].op == Operation.NEGATION:
-                lhs.negation()
-            if not add_constraint(rhs[0], lhs, sub):
-                return False
+            bound = materialize(rhs, l_term.op == Operation.NEGATION)
+            if not add_constraint(Term('Variable', Operation.NOP, key(lhs)), bound, sub):
+                return failed(stats, 'occurs')
             continue
-        if rhs[0].type == 'Function':
-            if lhs[0].type != 'Variable':
-                return False
-            if lhs[0].op == Operation.NEGATION:
-                rhs.negation()
-            if not add_constraint(lhs[0], rhs, sub):
-                return False
-            continue
-        return False
-    for v, expr in sub.items():
-        if expr[0].type != 'Function':
+        if l_term.type == 'Constant' and r_term.type == 'Constant' and l_term == r_term:
             continue
-        for var in expr.variables():
-            if var in sub:
-                replacement = sub[var]
-                while replacement[0].type == 'Variable' and replacement[0].value in sub:
-                    should_negate = replacement[0].op == Operation.NEGATION
-                    replacement = sub[replacement[0].value]
-                    if should_negate:
-                        replacement.negation()
-                if replacement.contains(Term('Variable', Operation.NOP, var)):
-                    return False
-                expr.replace(var, replacement)
-    substitution.update(sub)
+        return failed(stats, 'constant')
+    resolved = {}
+    for value in sub:
+        if not resolve(value, sub, resolved):
+            return failed(stats, 'cycle')
+    substitution.update(resolved)
     return True
 
 def is_equal(left: Expression, right: Expression) -> bool:
@@ -0,0 +1,150 @@
+import os
+import mmap
+import tempfile
+from collections import deque
+from typing import Iterable, Iterator, Optional, Tuple, Union
+from constructor import Expression
+from codec import MAGIC, VERSION, encode_into, decode_from, header, write_varint, read_varint
+
+# an entry is a formula or a pair of formula ids (minor, major) with an estimate of the result size
+Pair = Tuple[int, int, int]
+Entry = Union[Expression, Pair]
+EXPRESSION, PAIR = 0, 1
+
+
+def encode_entry(out: bytearray, entry: Entry):
+    if isinstance(entry, Expression):
+        out.append(EXPRESSION)
+        encode_into(out, entry)
+        return
+    out.append(PAIR)
+    for value in entry:
+        write_varint(out, value)
+
+
+def decode_entry(view: memoryview, pos: int) -> Tuple[Entry, int]:
+    kind = view[pos]
+    if kind == EXPRESSION:
+        return decode_from(view, pos + 1)
+    if kind != PAIR:
+        raise ValueError(f"Unknown frontier entry {kind}")
+    pos += 1
+    values = []
+    for _ in range(3):
+        value, pos = read_varint(view, pos)
+        values.append(value)
+    return tuple(values), pos
+
+
+class SpillingFrontier:
+    # a FIFO queue of entries: the oldest ones are kept in memory, the newer ones are appended
+    # to a file in the codec format and read back through mmap when the head runs out
+    def __init__(self, limit: int = 100000, directory: Optional[str] = None, chunk: int = 4096):
+        if limit < 1:
+            raise ValueError("The in-memory limit must be positive")
+        self.limit_ = limit
+        self.chunk_ = min(chunk, limit)
+        self.head_: deque = deque()
+        self.tail_: deque = deque()
+        self.file_ = tempfile.TemporaryFile(dir=directory)
+        self.map_: Optional[mmap.mmap] = None
+        self.spilled_ = 0
+        self.read_ = 0
+        self.reset()
+
+    def reset(self):
+        # nothing is left in the file, it starts over
+        if self.map_ is not None:
+            self.map_.close()
+            self.map_ = None
+        self.file_.seek(0)
+        self.file_.truncate()
+        self.file_.write(MAGIC + bytes([VERSION]))
+        self.read_ = len(MAGIC) + 1
+        self.spilled_ = 0
+
+    def __len__(self):
+        return len(self.head_) + self.spilled_ + len(self.tail_)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator[Entry]:
+        yield from self.head_
+        if self.spilled_:
+            pos = self.read_
+            view = self.view()
+            try:
+                for _ in range(self.spilled_):
+                    entry, pos = decode_entry(view, pos)
+                    yield entry
+            finally:
+                view.release()
+        yield from self.tail_
+
+    def append(self, entry: Entry):
+        if not self.spilled_ and not self.tail_ and len(self.head_) < self.limit_:
+            self.head_.append(entry)
+            return
+        self.tail_.append(entry)
+        if len(self.tail_) >= self.chunk_:
+            self.spill()
+
+    def extend(self, entries: Iterable[Entry]):
+        for entry in entries:
+            self.append(entry)
+
+    def spill(self):
+        out = bytearray()
+        for entry in self.tail_:
+            encode_entry(out, entry)
+        self.file_.seek(0, os.SEEK_END)
+        self.file_.write(out)
+        self.spilled_ += len(self.tail_)
+        self.tail_.clear()
+
+    def view(self) -> memoryview:
+        self.file_.flush()
+        size = os.fstat(self.file_.fileno()).st_size
+        if self.map_ is None or len(self.map_) < size:
+            if self.map_ is not None:
+                self.map_.close()
+            self.map_ = mmap.mmap(self.file_.fileno(), size, access=mmap.ACCESS_READ)
+            with memoryview(self.map_) as view:
+                header(view)
+        return memoryview(self.map_)
+
+    def refill(self):
+        if not self.spilled_:
+            self.head_.extend(self.tail_)
+            self.tail_.clear()
+            return
+        view = self.view()
+        pos = self.read_
+        count = min(self.limit_, self.spilled_)
+        for _ in range(count):
+            entry, pos = decode_entry(view, pos)
+            self.head_.append(entry)
+        view.release()
+        self.read_ = pos
+        self.spilled_ -= count
+        if not self.spilled_:
+            self.reset()
+
+    def popleft(self) -> Entry:
+        if not self.head_:
+            self.refill()
+        if not self.head_:
+            raise IndexError("pop from an empty frontier")
+        return self.head_.popleft()
+
+    def clear(self):
+        self.head_.clear()
+        self.tail_.clear()
+        self.reset()
+
+    def close(self):
+        if self.map_ is not None:
+            self.map_.close()
+            self.map_ = None
+        self.file_.close()
@@ -0,0 +1,126 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from constructor import Expression, Operation
+
+# the targets in a discrimination tree over the symbols of their preorder: a formula proves a target when
+# the target is an instance of it, and a variable of the formula matches any whole subterm of the target,
+# so the lookup follows the symbols of the formula and skips one subterm of the stored paths per variable
+Symbol = Tuple
+Binding = Dict[int, Expression]
+END = None
+
+
+def symbol(expression: Expression, idx: int) -> Symbol:
+    term = expression[idx]
+    if term.type == 'Function':
+        return term.type, term.op
+    return term.type, term.value, term.op == Operation.NEGATION
+
+
+def symbols(expression: Expression) -> List[Symbol]:
+    result = []
+    stack = [0]
+    while stack:
+        idx = stack.pop()
+        result.append(symbol(expression, idx))
+        if expression[idx].type == 'Function':
+            rel = expression.subtree(idx)
+            stack.append(rel.right())
+            stack.append(rel.left())
+    return result
+
+
+def match(general: Expression, instance: Expression) -> Optional[Binding]:
+    # the substitution of the variables of general that gives instance, a negated variable binds
+    # to the negation of its subterm
+    binding: Binding = {}
+    texts: Dict[int, str] = {}
+    stack = [(0, 0)]
+    while stack:
+        g_idx, s_idx = stack.pop()
+        g, s = general[g_idx], instance[s_idx]
+        if g.type == 'Variable':
+            subterm = instance.subtree_copy(s_idx)
+            if g.op == Operation.NEGATION:
+                subterm.negation()
+            text = subterm.to_string()
+            if texts.setdefault(g.value, text) != text:
+                return None
+            binding[g.value] = subterm
+        elif g.type == 'Constant':
+            if g != s:
+                return None
+        elif s.type != 'Function' or g.op != s.op:
+            return None
+        else:
+            g_rel, s_rel = general.subtree(g_idx), instance.subtree(s_idx)
+            stack.append((g_rel.right(), s_rel.right()))
+            stack.append((g_rel.left(), s_rel.left()))
+    # the negation of a subterm is not always its exact inverse, so the instance is rebuilt to be sure
+    result = general.subtree_copy(0)
+    for value, subterm in binding.items():
+        result.replace(value, subterm)
+    if result.to_string() != instance.to_string():
+        return None
+    return binding
+
+
+class GoalIndex:
+    def __init__(self):
+        self.root_: dict = {}
+        self.goals_: List[Expression] = []
+        self.max_size_ = 0
+
+    def __len__(self):
+        return len(self.goals_)
+
+    def clear(self):
+        self.root_.clear()
+        self.goals_.clear()
+        self.max_size_ = 0
+
+    def add(self, goal: Expression) -> int:
+        node = self.root_
+        for item in symbols(goal):
+            node = node.setdefault(item, {})
+        node.setdefault(END, []).append(len(self.goals_))
+        self.goals_.append(goal)
+        self.max_size_ = max(self.max_size_, len(goal))
+        return len(self.goals_) - 1
+
+    @staticmethod
+    def skip(node: dict) -> Iterator[dict]:
+        # the nodes one whole subterm below node: a function opens two subterms and a leaf closes one
+        stack = [(node, 1)]
+        while stack:
+            current, pending = stack.pop()
+            if pending == 0:
+                yield current
+                continue
+            for item, child in current.items():
+                if item is not END:
+                    stack.append((child, pending + (1 if item[0] == 'Function' else -1)))
+
+    def candidates(self, expression: Expression) -> Iterator[int]:
+        query = symbols(expression)
+        stack = [(self.root_, 0)]
+        while stack:
+            node, pos = stack.pop()
+            if pos == len(query):
+                yield from node.get(END, ())
+                continue
+            if query[pos][0] == 'Variable':
+                stack.extend((child, pos + 1) for child in self.skip(node))
+                continue
+            child = node.get(query[pos])
+            if child is not None:
+                stack.append((child, pos + 1))
+
+    def match(self, expression: Expression) -> Optional[Tuple[int, Binding]]:
+        # the first goal that is an instance of expression and the substitution that gives it
+        if expression.empty() or len(expression) > self.max_size_:
+            return None
+        for idx in self.candidates(expression):
+            binding = match(expression, self.goals_[idx])
+            if binding is not None:
+                return idx, binding
+        return None
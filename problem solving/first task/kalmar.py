@@ -0,0 +1,162 @@
+import time
+from typing import List, Dict, Tuple, Generator, Iterator, Optional
+from constructor import Expression, Term, Operation, INVALID_INDEX
+from proof import Proof, AXIOM_1, instantiate
+from lemmas import Lemmas
+from compress import compressing
+from bdd import is_tautology
+
+Leaf = Tuple[str, int]
+
+
+def negated(expression: Expression) -> Expression:
+    result = Expression(expression)
+    result.negation()
+    return result
+
+
+def evaluate(expression: Expression, valuation: Dict[Leaf, bool], idx=0) -> bool:
+    term = expression[idx]
+    if term.type != 'Function':
+        value = valuation[(term.type, term.value)]
+        return not value if term.op == Operation.NEGATION else value
+    left = evaluate(expression, valuation, expression.subtree(idx).left())
+    right = evaluate(expression, valuation, expression.subtree(idx).right())
+    if term.op == Operation.IMPLICATION:
+        return not left or right
+    if term.op == Operation.CONJUNCTION:
+        return left and right
+    if term.op == Operation.DISJUNCTION:
+        return left or right
+    if term.op == Operation.XOR:
+        return left != right
+    return left == right
+
+
+def leaves(expression: Expression) -> List[Leaf]:
+    result = []
+    for node in expression.nodes:
+        key = (node.term.type, node.term.value)
+        if node.term.type != 'Function' and key not in result:
+            result.append(key)
+    return result
+
+
+def literal(leaf: Leaf, value: bool) -> Expression:
+    return Expression(Term(leaf[0], Operation.NOP if value else Operation.NEGATION, leaf[1]))
+
+
+class KalmarSolver:
+    def __init__(self, target: Expression, time_limit_ms: Optional[float] = None):
+        # the construction is exponential in the number of letters, with a limit it gives up at the deadline
+        self.time_limit_ = time_limit_ms
+        self.deadline_: Optional[float] = None
+        self.target_ = Expression(target)
+        self.target_.standardize()
+        self.leaves_ = leaves(self.target_)
+        self.proof_ = Proof()
+        self.conclusion_ = INVALID_INDEX
+        self.proved_ = False
+        self.ss = ''
+
+    def supported(self) -> bool:
+        return all(node.term.type != 'Function' or
+                   node.term.op in {Operation.IMPLICATION, Operation.CONJUNCTION}
+                   for node in self.target_.nodes)
+
+    def is_tautology(self) -> bool:
+        return is_tautology(self.target_)
+
+    def prove_row(self, proof: Proof, valuation: Dict[Leaf, bool], idx: int) -> Tuple[int, bool]:
+        # derives the subformula at idx or its negation from the literals of the row
+        subformula = self.target_.subtree_copy(idx)
+        term = self.target_[idx]
+        if term.type != 'Function':
+            value = evaluate(subformula, valuation)
+            return proof.add(subformula if value else negated(subformula)), value
+        rel = self.target_.subtree(idx)
+        lhs = self.target_.subtree_copy(rel.left())
+        rhs = self.target_.subtree_copy(rel.right())
+        left, left_value = self.prove_row(proof, valuation, rel.left())
+        right, right_value = self.prove_row(proof, valuation, rel.right())
+        if term.op == Operation.IMPLICATION:
+            if right_value:
+                return proof.mp(right, proof.add(instantiate(AXIOM_1, {1: rhs, 2: lhs}))), True
+            if not left_value:
+                lemma = Lemmas.apply(proof, 'ex_falso', {1: lhs, 2: rhs})
+                return proof.mp(left, lemma), True
+            lemma = Lemmas.apply(proof, 'negated_implication', {1: lhs, 2: rhs})
+            return proof.mp(right, proof.mp(left, lemma)), False
+        if left_value and right_value:
+            lemma = Lemmas.apply(proof, 'negated_implication', {1: lhs, 2: negated(rhs)})
+            return proof.mp(right, proof.mp(left, lemma)), True
+        if not left_value:
+            lemma = Lemmas.apply(proof, 'ex_falso', {1: lhs, 2: negated(rhs)})
+            return proof.mp(left, lemma), False
+        return proof.mp(right, proof.add(instantiate(AXIOM_1, {1: negated(rhs), 2: lhs}))), False
+
+    def eliminate(self, valuation: Dict[Leaf, bool]) -> Generator[None, None, Tuple[Proof, int]]:
+        # yields after every row and every line moved, there are 2^n rows
+        depth = len(valuation)
+        if depth == len(self.leaves_):
+            proof = Proof()
+            for leaf, value in valuation.items():
+                proof.add(literal(leaf, value))
+            conclusion, value = self.prove_row(proof, valuation, 0)
+            yield
+            return proof, conclusion
+        leaf = self.leaves_[depth]
+        proof = Proof()
+        premises = []
+        for value in (True, False):
+            branch, conclusion = yield from self.eliminate({**valuation, leaf: value})
+            branch, conclusion = yield from branch.deducing(literal(leaf, value), conclusion)
+            premises.append((yield from proof.including(branch, conclusion)))
+        template, conclusion = Lemmas.get('cases')
+        lemma = yield from proof.including(template, conclusion, {1: literal(leaf, True), 2: self.target_})
+        return proof, proof.mp(premises[1], proof.mp(premises[0], lemma))
+
+    def expired(self) -> bool:
+        return self.deadline_ is not None and time.time() * 1000 > self.deadline_
+
+    def bounded(self, steps: Generator) -> Generator[None, None, Optional[object]]:
+        # runs a stage of the construction and returns its result, or None once the deadline has passed
+        while not self.expired():
+            try:
+                next(steps)
+            except StopIteration as stop:
+                return stop.value
+            yield
+        steps.close()
+        return None
+
+    def solve(self) -> bool:
+        for _ in self.steps():
+            pass
+        return self.proved_
+
+    def steps(self) -> Iterator[None]:
+        self.ss = f"Kalmár construction: ⊢ {self.target_}\n"
+        if not self.supported():
+            self.ss += "Only !, >, * and | are supported by the construction\n"
+            return
+        if not self.is_tautology():
+            self.ss += "The expression is not a tautology\n"
+            return
+        if self.time_limit_ is not None:
+            self.deadline_ = time.time() * 1000 + self.time_limit_
+        result = yield from self.bounded(self.eliminate({}))
+        if result is None:
+            self.ss += "The construction did not finish in the time allotted\n"
+            return
+        self.proof_, self.conclusion_ = result
+        text = yield from self.bounded(compressing(self.proof_.to_string(self.conclusion_)))
+        if text is None:
+            self.ss += "The construction did not finish in the time allotted\n"
+            return
+        self.ss += text
+        self.ss += f"proved: {self.target_}\n"
+        self.proved_ = True
+
+    def thought_chain(self) -> str:
+        return self.ss
@@ -0,0 +1,138 @@
+from typing import List, Dict, Tuple
+from constructor import Expression, Operation
+from proof import Proof
+
+# the connectives whose operands commutation() can reorder, the axioms say nothing about | + and =
+REORDERABLE = {Operation.IMPLICATION, Operation.CONJUNCTION}
+
+
+def derive(hypotheses: List[str], steps: List[Tuple[str, ...]]) -> Tuple[Proof, int]:
+    # steps are either ("axiom instance",) or ("formula", minor, major) referring to earlier steps;
+    # the hypotheses are discharged right to left with the deduction theorem
+    proof = Proof()
+    indices = [proof.add(Expression(h)) for h in hypotheses]
+    for step in steps:
+        if len(step) == 1:
+            indices.append(proof.add(Expression(step[0])))
+        else:
+            indices.append(proof.mp(indices[step[1]], indices[step[2]]))
+    conclusion = indices[-1]
+    for hypothesis in reversed(hypotheses):
+        proof, conclusion = proof.deduce(Expression(hypothesis), conclusion)
+    return proof, conclusion
+
+
+class Lemmas:
+    templates_: Dict[str, Tuple[Proof, int]] = {}
+
+    @classmethod
+    def get(cls, name: str) -> Tuple[Proof, int]:
+        if not cls.templates_:
+            cls.build()
+        return cls.templates_[name]
+
+    @classmethod
+    def build(cls):
+        # !a, a ⊢ b
+        cls.templates_['ex_falso'] = derive(["!a", "a"], [
+            ("!a>(!b>!a)",), ("!b>!a", 0, 2),
+            ("a>(!b>a)",), ("!b>a", 1, 4),
+            ("(!b>!a)>((!b>a)>b)",), ("(!b>a)>b", 3, 6), ("b", 5, 7),
+        ])
+        # a>b, !b ⊢ !a
+        cls.templates_['contraposition'] = derive(["a>b", "!b"], [
+            ("!b>(a>!b)",), ("a>!b", 1, 2),
+            ("(a>!b)>((a>b)>!a)",), ("(a>b)>!a", 3, 4), ("!a", 0, 5),
+        ])
+        # a, !b ⊢ a*!b, the negation of a>b
+        inner, inner_conclusion = derive(["a>b"], [("a",), ("b", 1, 0)])
+        proof = Proof()
+        modus = proof.include(inner, inner_conclusion)
+        negation = proof.add(Expression("!b"))
+        weakened = proof.mp(negation, proof.add(Expression("!b>((a>b)>!b)")))
+        axiom = proof.add(Expression("((a>b)>!b)>(((a>b)>b)>(a*!b))"))
+        conclusion = proof.mp(modus, proof.mp(weakened, axiom))
+        proof, conclusion = proof.deduce(Expression("!b"), conclusion)
+        proof, conclusion = proof.deduce(Expression("a"), conclusion)
+        cls.templates_['negated_implication'] = (proof, conclusion)
+        # a>b, !a>b ⊢ b
+        proof = Proof()
+        positive = proof.add(Expression("a>b"))
+        negative = proof.add(Expression("!a>b"))
+        first = proof.mp(positive, cls.apply(proof, 'contraposition', {1: Expression("a"), 2: Expression("b")}))
+        second = proof.mp(negative, cls.apply(proof, 'contraposition', {1: Expression("!a"), 2: Expression("b")}))
+        axiom = proof.add(Expression("(!b>!a)>((!b>a)>b)"))
+        conclusion = proof.mp(second, proof.mp(first, axiom))
+        proof, conclusion = proof.deduce(Expression("!a>b"), conclusion)
+        proof, conclusion = proof.deduce(Expression("a>b"), conclusion)
+        cls.templates_['cases'] = (proof, conclusion)
+        proof = Proof()
+        cls.templates_['identity'] = (proof, proof.identity(Expression("a")))
+        # a>b, b>c ⊢ a>c
+        cls.templates_['syllogism'] = derive(["a>b", "b>c", "a"], [("b", 2, 0), ("c", 3, 1)])
+        # a*b is !(a>!b), so both projections are contrapositions of A1 and ex falso
+        proof = Proof()
+        lemma = cls.apply(proof, 'ex_falso', {1: Expression("a"), 2: Expression("!b")})
+        contraposition = cls.apply(proof, 'contraposition', {1: Expression("!a"), 2: Expression("a>!b")})
+        cls.templates_['conjunction_left'] = (proof, proof.mp(lemma, contraposition))
+        proof = Proof()
+        axiom = proof.add(Expression("!b>(a>!b)"))
+        contraposition = cls.apply(proof, 'contraposition', {1: Expression("!b"), 2: Expression("a>!b")})
+        cls.templates_['conjunction_right'] = (proof, proof.mp(axiom, contraposition))
+        proof = Proof()
+        conclusion = cls.apply(proof, 'negated_implication', {1: Expression("a"), 2: Expression("!b")})
+        cls.templates_['conjunction'] = (proof, conclusion)
+
+    @classmethod
+    def apply(cls, proof: Proof, name: str, mapping: Dict[int, Expression]) -> int:
+        template, conclusion = cls.get(name)
+        return proof.include(template, conclusion, mapping)
+
+
+def reorderable(expression: Expression) -> bool:
+    return all(node.term.type != 'Function' or node.term.op in REORDERABLE for node in expression.nodes)
+
+
+def same(left: Expression, right: Expression) -> bool:
+    # equal up to the order of the operands of conjunctions
+    left, right = Expression(left), Expression(right)
+    left.canonicalize()
+    right.canonicalize()
+    return left.to_string() == right.to_string()
+
+
+def transport(proof: Proof, line: int, source: Expression, target: Expression) -> int:
+    # a line of target from a line of source
+    if source.to_string() == target.to_string():
+        return line
+    inner, conclusion = commutation(source, target)
+    return proof.mp(line, proof.include(inner, conclusion))
+
+
+def commutation(source: Expression, target: Expression) -> Tuple[Proof, int]:
+    # ⊢ source>target for formulas that differ in the order of the operands of conjunctions: the conjuncts
+    # are taken apart and joined in the other order, an implication is rebuilt from both directions of its parts
+    proof = Proof()
+    if source.to_string() == target.to_string():
+        return proof, proof.identity(source)
+    op = source[0].op
+    if source[0].type != 'Function' or target[0].type != 'Function' or target[0].op != op or op not in REORDERABLE:
+        raise ValueError(f"{source} and {target} differ not only in the order of operands")
+    a = source.subtree_copy(source.subtree(0).left())
+    b = source.subtree_copy(source.subtree(0).right())
+    c = target.subtree_copy(target.subtree(0).left())
+    d = target.subtree_copy(target.subtree(0).right())
+    hypothesis = proof.add(source)
+    if op == Operation.CONJUNCTION:
+        left = proof.mp(hypothesis, Lemmas.apply(proof, 'conjunction_left', {1: a, 2: b}))
+        right = proof.mp(hypothesis, Lemmas.apply(proof, 'conjunction_right', {1: a, 2: b}))
+        if not (same(a, c) and same(b, d)):
+            left, right, a, b = right, left, b, a
+        left = transport(proof, left, a, c)
+        right = transport(proof, right, b, d)
+        conclusion = proof.mp(right, proof.mp(left, Lemmas.apply(proof, 'conjunction', {1: c, 2: d})))
+    else:
+        antecedent = transport(proof, proof.add(c), c, a)
+        conclusion = transport(proof, proof.mp(antecedent, hypothesis), b, d)
+        proof, conclusion = proof.deduce(c, conclusion)
+    return proof.deduce(source, conclusion)
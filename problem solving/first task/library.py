@@ -0,0 +1,61 @@
+import os
+import json
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+# the lemmas that appeared in extracted proofs, by canonical form: how many proofs used them and
+# a derivation from the axioms, so that a later search can start from them
+Derivation = List[Tuple[str, List[str]]]
+
+
+class LemmaLibrary:
+    def __init__(self, path: Optional[str] = None):
+        self.path_ = path
+        self.runs_ = 0
+        self.lemmas_: Dict[str, dict] = {}
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.lemmas_)
+
+    def __contains__(self, key: str):
+        return key in self.lemmas_
+
+    def load(self):
+        with open(self.path_) as file:
+            data = json.load(file)
+        self.runs_ = data.get('runs', 0)
+        self.lemmas_ = data.get('lemmas', {})
+
+    def save(self):
+        if self.path_ is None:
+            return
+        # written to a temporary file first, so that a parallel reader never sees half a library
+        directory = os.path.dirname(os.path.abspath(self.path_))
+        with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as file:
+            json.dump({'runs': self.runs_, 'lemmas': self.lemmas_}, file, indent=1, ensure_ascii=False)
+        os.replace(file.name, self.path_)
+
+    def used(self, key: str) -> int:
+        lemma = self.lemmas_.get(key)
+        return lemma['used'] if lemma is not None else 0
+
+    def record(self, key: str, formula: str, derivation: Derivation):
+        lemma = self.lemmas_.get(key)
+        if lemma is None:
+            self.lemmas_[key] = {'formula': formula, 'used': 1, 'derivation': [list(line) for line in derivation]}
+            return
+        lemma['used'] += 1
+        # the shortest derivation seen so far is kept
+        if len(derivation) < len(lemma['derivation']):
+            lemma['formula'] = formula
+            lemma['derivation'] = [list(line) for line in derivation]
+
+    def finish_run(self):
+        self.runs_ += 1
+
+    def seeds(self, limit: int, min_used: int = 1) -> List[Tuple[str, Derivation]]:
+        ranked = sorted(self.lemmas_.values(), key=lambda lemma: -lemma['used'])
+        return [(lemma['formula'], [(line[0], line[1]) for line in lemma['derivation']])
+                for lemma in ranked[:limit] if lemma['used'] >= min_used]
@@ -1,28 +1,80 @@
 import sys
+import time
+import argparse
+from contextlib import nullcontext
 from constructor import Expression
 from algorithm import Solver
+from rules import DERIVED_RULES
+from stats import SearchStats, progress
+from library import LemmaLibrary
+from proof_cache import ProofCache
+from checker import ProofChecker
+
+AXIOMS = [
+    "a>(b>a)",
+    "(a>(b>c))>((a>b)>(a>c))",
+    "(!a>!b)>((!a>b)>a)",
+    "a>(!a>b)",
+    "a*b>a",
+    "a*b>b",
+    "a>(b>(a*b))",
+    "a>a"
+]
+
+def prove(target: Expression, time_limit_ms: int, library: LemmaLibrary = None, seeds: int = 16,
+          widening: int = 4, **kwargs) -> Solver:
+    # premise selection: a pass gets only the most relevant lemmas of the library, a pass that fails
+    # gives its share of the time to a wider selection, and the last pass falls back to the Kalmár construction
+    deadline = time.time() * 1000 + time_limit_ms
+    passes = 1
+    while library is not None and seeds * widening ** (passes - 1) < len(library):
+        passes += 1
+    for i in range(passes):
+        last = i == passes - 1
+        remaining = max(0, int(deadline - time.time() * 1000))
+        solver = Solver([Expression(axiom) for axiom in AXIOMS], Expression(target), remaining // (passes - i),
+                        DERIVED_RULES, library=library, seeds=seeds * widening ** i, fallback=last, **kwargs)
+        solver.solve()
+        if last or solver.method_ != 'timeout':
+            return solver
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Searches for a proof of the formula read from stdin")
+    parser.add_argument('--stats', help="write search statistics to this JSON file")
+    parser.add_argument('--progress', action='store_true', help="report every generation to stderr")
+    parser.add_argument('--memory-limit', type=int, help="formulas kept in memory, the rest of the queue goes to disk")
+    parser.add_argument('--active-limit', type=int, help="formulas paired with new ones, the older and heavier are demoted")
+    parser.add_argument('--library', help="JSON file with the lemmas of earlier proofs, updated after the run")
+    parser.add_argument('--cache', help="directory of proofs of earlier targets, up to renaming of the letters")
+    parser.add_argument('--premises', type=int, default=16, help="lemmas of the library selected for the first pass")
+    args = parser.parse_args()
+    stats = None
+    if args.stats or args.progress:
+        stats = SearchStats(args.stats, [progress] if args.progress else [])
+
     expression_str = input()
-    target = Expression(expression_str)
-    target.standardize()
-    target.make_permanent()
-
-    axioms = [
-        Expression("a>(b>a)"),
-        Expression("(a>(b>c))>((a>b)>(a>c))"),
-        Expression("(!a>!b)>((!a>b)>a)"),
-        Expression("a>(!a>b)"),
-        Expression("a*b>a"),
-        Expression("a*b>b"),
-        Expression("a>(b>(a*b))"),
-        Expression("a>a")
-    ]
+    with stats.phase('parse') if stats is not None else nullcontext():
+        target = Expression(expression_str)
+        target.standardize()
+        target.make_permanent()
 
     print(f"your input: {target}", file=sys.stderr)
 
-    solve = Solver(axioms, target, 10000)
-    solve.solve()
+    cache = ProofCache(args.cache) if args.cache else None
+    proof = cache.get(target) if cache is not None else None
+    if proof is not None:
+        print(proof)
+        return 0
+
+    library = LemmaLibrary(args.library) if args.library else None
+    solve = prove(target, 10000, library, args.premises, stats=stats, memory_limit=args.memory_limit,
+                  active_limit=args.active_limit)
+    if library is not None:
+        library.save()
+    # only a proof that passes the checker is stored
+    if cache is not None and solve.proved_ and ProofChecker().check(solve.thought_chain(), str(target))[0]:
+        cache.put(target, solve.thought_chain())
 
     print(solve.thought_chain())
     return 0
@@ -0,0 +1,123 @@
+from typing import Callable, Dict, List, Optional
+from constructor import Expression, Term, Operation
+from modus_ponens import modus_ponens
+
+# detachment from a fixed schema: the antecedent is matched by straight-line code generated once per schema,
+# a generated function returns None when the minor premise needs the general unification
+Matcher = Callable[[Expression], Optional[Expression]]
+
+MATCHERS_: Dict[str, Optional[Matcher]] = {}
+
+
+def part(minor: Expression, idx: int, negate: bool) -> Expression:
+    result = minor.subtree_copy(idx)
+    if negate:
+        result.negation()
+    return result
+
+
+def leaf(term_type: str, op: Operation, value: int) -> Expression:
+    return Expression(Term(term_type, op, value))
+
+
+def is_linear(schema: Expression, idx: int) -> bool:
+    seen = set()
+    stack = [idx]
+    while stack:
+        current = stack.pop()
+        term = schema[current]
+        if term.type == 'Variable':
+            if term.value in seen:
+                return False
+            seen.add(term.value)
+        elif term.type == 'Function':
+            stack.append(schema.subtree(current).left())
+            stack.append(schema.subtree(current).right())
+    return True
+
+
+def generate(schema: Expression) -> str:
+    lines = ["def detach(minor):",
+             "    if minor.empty():",
+             "        return Expression()",
+             "    n = minor.nodes"]
+    bindings = {}
+    counter = [0]
+
+    def fresh() -> str:
+        counter[0] += 1
+        return f"i{counter[0]}"
+
+    def match(idx: int, name: str):
+        term = schema[idx]
+        if term.type == 'Variable':
+            bindings[term.value] = (name, term.op == Operation.NEGATION)
+            return
+        lines.append(f"    t = n[{name}].term")
+        if term.type == 'Constant':
+            lines.append("    if t.type == 'Variable':")
+            lines.append("        return None")
+            lines.append(f"    if t.type != 'Constant' or t.value != {term.value} or t.op is not {term.op}:")
+            lines.append("        return Expression()")
+            return
+        lines.append("    if t.type != 'Function':")
+        lines.append("        return None if t.type == 'Variable' else Expression()")
+        lines.append(f"    if t.op is not {term.op}:")
+        lines.append("        return Expression()")
+        left, right = fresh(), fresh()
+        lines.append(f"    {left}, {right} = n[{name}].rel.refs[1], n[{name}].rel.refs[2]")
+        match(schema.subtree(idx).left(), left)
+        match(schema.subtree(idx).right(), right)
+
+    def build(idx: int) -> str:
+        term = schema[idx]
+        if term.type == 'Function':
+            left = build(schema.subtree(idx).left())
+            right = build(schema.subtree(idx).right())
+            return f"Expression.construct({left}, {term.op}, {right})"
+        negated = term.op == Operation.NEGATION
+        if term.type == 'Variable' and term.value in bindings:
+            name, negate = bindings[term.value]
+            return f"part(minor, {name}, {negate != negated})"
+        if term.type == 'Variable':
+            return f"leaf('Variable', {term.op}, shift + {term.value})"
+        return f"leaf('Constant', {term.op}, {term.value})"
+
+    root = schema.subtree(0)
+    lines.append("    i0 = 0")
+    match(root.left(), "i0")
+    lines.append("    shift = minor.max_value()")
+    lines.append(f"    result = {build(root.right())}")
+    lines.append("    result.normalize()")
+    lines.append("    return result")
+    return '\n'.join(lines) + '\n'
+
+
+def compile_matcher(schema: Expression) -> Optional[Matcher]:
+    # a repeated variable in the antecedent needs unification of two parts of the minor premise
+    if schema.empty() or schema[0].type != 'Function' or schema[0].op != Operation.IMPLICATION:
+        return None
+    if not is_linear(schema, schema.subtree(0).left()):
+        return None
+    namespace = {'Expression': Expression, 'Operation': Operation, 'part': part, 'leaf': leaf}
+    exec(compile(generate(schema), f"<matcher {schema}>", 'exec'), namespace)
+    return namespace['detach']
+
+
+def matcher(schema: Expression) -> Optional[Matcher]:
+    key = schema.to_string()
+    if key not in MATCHERS_:
+        MATCHERS_[key] = compile_matcher(Expression(schema).subtree_copy(0))
+    return MATCHERS_[key]
+
+
+def detach(minor: Expression, major: Expression, compiled: Optional[Matcher] = None, stats=None) -> Expression:
+    if compiled is not None:
+        result = compiled(minor)
+        if result is not None:
+            if stats is not None:
+                stats.count('matcher.matched' if not result.empty() else 'matcher.rejected')
+            return result
+        if stats is not None:
+            stats.count('matcher.fallback')
+    return modus_ponens(minor, major, stats)
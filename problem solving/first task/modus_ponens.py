@@ -1,24 +1,26 @@
-def modus_ponens(a: Expression, b: Expression) -> Expression:
+from constructor import Expression, Operation
+from exp_methods import unification, materialize
+
+def modus_ponens(a: Expression, b: Expression, stats=None) -> Expression:
     if a.empty() or b.empty():
         return Expression()
     if b[0].op != Operation.IMPLICATION:
+        if stats is not None:
+            stats.count('modus_ponens.not_implication')
         return Expression()
+    if stats is not None:
+        stats.count('unification.attempts')
     substitution = {}
-    if not unification(a, b.subtree_copy(b.subtree(0).left()), substitution):
+    # b is renamed apart from a only inside the unification, the consequent is the one formula copied
+    offset = a.max_value() + 1
+    rel = b.subtree(0)
+    if not unification(a, b, substitution, stats=stats, right_idx=rel.left(), offset=offset):
         return Expression()
-    result = b.subtree_copy(0)
-    result.change_variables(a.max_value() + 1)
-    vars = result.variables()
-    for var in vars:
-        if var not in substitution:
-            continue
-        change = substitution[var]
-        while change[0].type == 'Variable' and change[0].value in substitution:
-            should_negate = change[0].op == Operation.NEGATION
-            change = substitution[change[0].value]
-            if should_negate:
-                change.negation()
-        result.replace(var, change)
-    result = result.subtree_copy(result.subtree(0).right())
+    if stats is not None:
+        stats.count('unification.succeeded')
+    result = materialize((b, rel.right(), offset))
+    for var in set(result.variables()):
+        if var in substitution:
+            result.replace(var, substitution[var])
     result.normalize()
-    return result
\ No newline at end of file
+    return result
@@ -294,10 +294,11 @@ class Expression:
                     Operation.NOP if self.nodes[node_idx].term.op == Operation.NEGATION else Operation.NEGATION
                 )
                 continue
-            self.nodes[node_idx].term.op = opposite(self.nodes[node_idx].term.op)
-            if self.nodes[node_idx].term.op in {Operation.IMPLICATION, Operation.CONJUNCTION}:
+            op = self.nodes[node_idx].term.op
+            self.nodes[node_idx].term.op = opposite(op)
+            if op in {Operation.IMPLICATION, Operation.CONJUNCTION}:
                 q.append(self.subtree(node_idx).right())
-            elif self.nodes[node_idx].term.op == Operation.DISJUNCTION:
+            elif op == Operation.DISJUNCTION:
                 q.append(self.subtree(node_idx).left())
                 q.append(self.subtree(node_idx).right())
 
@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import tempfile
+import multiprocessing
+from typing import List, Dict, Tuple
+from constructor import Expression
+from algorithm import Solver
+from rules import DERIVED_RULES
+from main import AXIOMS
+
+# every configuration searches from the same axioms: the solver keeps only the three Hilbert axioms,
+# so the proofs stay checkable against them
+OPTIONS = {'name', 'rules', 'decompose', 'size_factor', 'order', 'memory_limit', 'lazy', 'skeleton_depth',
+           'active_limit', 'active_nodes', 'age_weight_ratio'}
+
+
+def load_portfolio(path: str) -> List[dict]:
+    with open(path) as file:
+        portfolio = json.load(file)
+    if not isinstance(portfolio, list) or not portfolio:
+        raise ValueError(f"{path}: the portfolio must be a non-empty list of configurations")
+    for i, config in enumerate(portfolio):
+        unknown = set(config) - OPTIONS
+        if unknown:
+            raise ValueError(f"{path}: configuration {i} has unknown options {sorted(unknown)}")
+        config.setdefault('name', f"config-{i}")
+    return portfolio
+
+
+def make_solver(config: dict, target: Expression, time_limit_ms: int, dump_path: str) -> Solver:
+    return Solver([Expression(axiom) for axiom in AXIOMS], target, time_limit_ms,
+                  DERIVED_RULES if config.get('rules', True) else (), dump_path=dump_path,
+                  decompose=config.get('decompose', True), size_factor=config.get('size_factor', 1.0),
+                  order=config.get('order', 'fifo'), memory_limit=config.get('memory_limit'),
+                  lazy=config.get('lazy', True), skeleton_depth=config.get('skeleton_depth', 3),
+                  active_limit=config.get('active_limit'), active_nodes=config.get('active_nodes'),
+                  age_weight_ratio=tuple(config.get('age_weight_ratio', (1, 4))))
+
+
+def run(config: dict, target: str, time_limit_ms: int, directory: str, results: multiprocessing.Queue):
+    expression = Expression(target)
+    expression.standardize()
+    expression.make_permanent()
+    path = os.path.join(directory, f"conclusions-{os.getpid()}.txt")
+    solver = make_solver(config, expression, time_limit_ms, path)
+    solver.solve()
+    solver.dump_.close()
+    os.remove(path)
+    results.put((config['name'], solver.proved_, solver.thought_chain()))
+
+
+def race(target: str, portfolio: List[dict], time_limit_ms: int) -> Tuple[str, bool, str]:
+    # the first configuration that proves the target wins, the others are terminated
+    results = multiprocessing.Queue()
+    with tempfile.TemporaryDirectory(prefix="portfolio-") as directory:
+        workers: Dict[str, multiprocessing.Process] = {}
+        for config in portfolio:
+            worker = multiprocessing.Process(target=run, args=(config, target, time_limit_ms, directory, results),
+                                             daemon=True)
+            worker.start()
+            workers[config['name']] = worker
+        answer = None
+        remaining = len(workers)
+        # the fallback construction may run past the search budget, so the deadline is generous
+        deadline = time.time() + 2 * time_limit_ms / 1000 + 60
+        try:
+            while remaining and time.time() < deadline:
+                try:
+                    name, proved, chain = results.get(timeout=0.1)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers.values()) and results.empty():
+                        break
+                    continue
+                remaining -= 1
+                if proved:
+                    answer = (name, proved, chain)
+                    break
+                if answer is None:
+                    answer = (name, proved, chain)
+        finally:
+            for worker in workers.values():
+                if worker.is_alive():
+                    worker.terminate()
+            for worker in workers.values():
+                worker.join()
+    return answer if answer is not None else ('', False, "No configuration finished\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Races several solver configurations on one target")
+    parser.add_argument('--config', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         'portfolio.json'))
+    parser.add_argument('--time-limit', type=int, default=10000, help="search budget of every configuration, ms")
+    args = parser.parse_args()
+    portfolio = load_portfolio(args.config)
+    target = input()
+    start = time.time()
+    name, proved, chain = race(target, portfolio, args.time_limit)
+    print(chain)
+    print(f"{name or 'no configuration'} finished first in {time.time() - start:.2f}s", file=sys.stderr)
+    return 0 if proved else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
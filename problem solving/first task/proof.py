@@ -0,0 +1,143 @@
+from typing import List, Dict, Tuple, Generator
+from constructor import Expression, Operation
+
+AXIOM_1 = Expression("a>(b>a)")
+AXIOM_2 = Expression("(a>(b>c))>((a>b)>(a>c))")
+AXIOM_3 = Expression("(!a>!b)>((!a>b)>a)")
+
+
+def instantiate(template: Expression, mapping: Dict[int, Expression]) -> Expression:
+    shift = max((expr.max_value() for expr in mapping.values()), default=0)
+    result = Expression(template)
+    for node in result.nodes:
+        if node.term.type == 'Variable':
+            node.term.value += shift
+    for value, expr in mapping.items():
+        result.replace(value + shift, expr)
+    return result
+
+
+def finish(steps: Generator):
+    # runs a stepwise computation to the end and returns its result
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+
+def implication(lhs: Expression, rhs: Expression) -> Expression:
+    return Expression.construct(lhs, Operation.IMPLICATION, rhs)
+
+
+class Proof:
+    def __init__(self):
+        self.lines_: List[Expression] = []
+        self.refs_: List[Tuple[int, ...]] = []
+        self.index_: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.lines_)
+
+    def __getitem__(self, idx) -> Expression:
+        return self.lines_[idx]
+
+    def find(self, expression: Expression) -> int:
+        return self.index_.get(expression.to_string(), -1)
+
+    def add(self, expression: Expression, refs: Tuple[int, ...] = ()) -> int:
+        representation = expression.to_string()
+        if representation in self.index_:
+            return self.index_[representation]
+        self.lines_.append(expression)
+        self.refs_.append(tuple(refs))
+        self.index_[representation] = len(self.lines_) - 1
+        return len(self.lines_) - 1
+
+    def mp(self, minor: int, major: int) -> int:
+        implication_ = self.lines_[major]
+        if implication_[0].type != 'Function' or implication_[0].op != Operation.IMPLICATION:
+            raise ValueError(f"Modus ponens is not applicable: {implication_} is not an implication")
+        premise = implication_.subtree_copy(implication_.subtree(0).left())
+        if premise.to_string() != self.lines_[minor].to_string():
+            raise ValueError(f"Modus ponens is not applicable: {self.lines_[minor]} does not match {premise}")
+        return self.add(implication_.subtree_copy(implication_.subtree(0).right()), (minor, major))
+
+    def include(self, other: 'Proof', conclusion: int, mapping: Dict[int, Expression] = None) -> int:
+        return finish(self.including(other, conclusion, mapping))
+
+    def including(self, other: 'Proof', conclusion: int,
+                  mapping: Dict[int, Expression] = None) -> Generator[None, None, int]:
+        # include() that yields after every line, the proofs of the Kalmár construction grow exponentially
+        remapping = {}
+        for idx in other.ancestors(conclusion):
+            yield
+            line = other.lines_[idx] if mapping is None else instantiate(other.lines_[idx], mapping)
+            remapping[idx] = self.add(line, tuple(remapping[ref] for ref in other.refs_[idx]))
+        return remapping[conclusion]
+
+    def ancestors(self, conclusion: int) -> List[int]:
+        needed = {conclusion}
+        for idx in range(conclusion, -1, -1):
+            if idx in needed:
+                needed.update(self.refs_[idx])
+        return sorted(needed)
+
+    def weaken(self, idx: int, hypothesis: Expression) -> int:
+        # ψ, ψ>(h>ψ) ⊢ h>ψ
+        axiom = self.add(instantiate(AXIOM_1, {1: self.lines_[idx], 2: hypothesis}))
+        return self.mp(idx, axiom)
+
+    def identity(self, hypothesis: Expression) -> int:
+        # ⊢ h>h in five steps from A1 and A2
+        loop = implication(hypothesis, hypothesis)
+        first = self.add(instantiate(AXIOM_1, {1: hypothesis, 2: loop}))
+        second = self.add(instantiate(AXIOM_2, {1: hypothesis, 2: loop, 3: hypothesis}))
+        third = self.mp(first, second)
+        fourth = self.add(instantiate(AXIOM_1, {1: hypothesis, 2: hypothesis}))
+        return self.mp(fourth, third)
+
+    def deduce(self, hypothesis: Expression, conclusion: int) -> Tuple['Proof', int]:
+        return finish(self.deducing(hypothesis, conclusion))
+
+    def deducing(self, hypothesis: Expression, conclusion: int) -> Generator[None, None, Tuple['Proof', int]]:
+        key = hypothesis.to_string()
+        result = Proof()
+        depends: Dict[int, bool] = {}
+        copied: Dict[int, int] = {}
+        implied: Dict[int, int] = {}
+
+        def lifted(idx: int) -> int:
+            if depends[idx]:
+                return implied[idx]
+            if idx not in implied:
+                implied[idx] = result.weaken(copied[idx], hypothesis)
+            return implied[idx]
+
+        for idx in self.ancestors(conclusion):
+            yield
+            line = self.lines_[idx]
+            refs = self.refs_[idx]
+            depends[idx] = line.to_string() == key or any(depends[ref] for ref in refs)
+            if not depends[idx]:
+                copied[idx] = result.add(line, tuple(copied[ref] for ref in refs))
+                continue
+            if line.to_string() == key:
+                implied[idx] = result.identity(hypothesis)
+                continue
+            minor, major = refs
+            # (h>(m>ψ))>((h>m)>(h>ψ)), then modus ponens twice
+            axiom = result.add(instantiate(AXIOM_2, {1: hypothesis, 2: self.lines_[minor], 3: line}))
+            partial = result.mp(lifted(major), axiom)
+            implied[idx] = result.mp(lifted(minor), partial)
+        return result, lifted(conclusion)
+
+    def to_string(self, conclusion: int, offset: int = 0) -> str:
+        # offset continues the numbering of the lines printed before
+        order = self.ancestors(conclusion)
+        numbers = {idx: offset + i + 1 for i, idx in enumerate(order)}
+        out = []
+        for idx in order:
+            refs = ','.join(str(numbers[ref]) for ref in self.refs_[idx])
+            out.append(f"{numbers[idx]}. step({refs}): {self.lines_[idx]}\n")
+        return ''.join(out)
@@ -0,0 +1,124 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from constructor import Expression, Term, Operation
+
+# proofs of standardized targets, keyed by the target with its constants renamed a, b, c, ... in the order
+# of their first appearance; a file holds one proof in these canonical letters and is named by the hash
+# of the key. Only proofs are cached, and in a proof the constants are the only standalone lowercase letters
+CONSTANT = re.compile(r'(?<![^\W\d_])[a-z](?![^\W\d_])')
+LETTERS = 26
+
+
+def letter(value: int) -> str:
+    return Term('Constant', Operation.NOP, value).to_string()
+
+
+def canonical_target(target: Expression) -> Optional[Tuple[str, Dict[str, str]]]:
+    # the key and the renaming of the letters of the target into the canonical ones
+    expression = Expression(target).subtree_copy(0)
+    order: Dict[int, int] = {}
+    for node in expression.nodes:
+        if node.term.type == 'Constant' and node.term.value not in order:
+            order[node.term.value] = len(order) + 1
+    if any(not 0 < value <= LETTERS for value in order):
+        return None
+    for node in expression.nodes:
+        if node.term.type == 'Constant':
+            node.term.value = order[node.term.value]
+    return expression.to_string(), {letter(old): letter(new) for old, new in order.items()}
+
+
+def rename(text: str, mapping: Dict[str, str]) -> str:
+    return CONSTANT.sub(lambda match: mapping.get(match.group(), match.group()), text)
+
+
+class ProofCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 64 << 20, memory_entries: int = 1024):
+        self.directory_ = directory
+        self.max_bytes_ = max_bytes
+        self.memory_entries_ = memory_entries
+        self.memory_: OrderedDict = OrderedDict()
+        self.hits_ = 0
+        self.misses_ = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory_, f"{digest}.json")
+
+    def remember(self, digest: str, proof: str):
+        self.memory_[digest] = proof
+        self.memory_.move_to_end(digest)
+        while len(self.memory_) > self.memory_entries_:
+            self.memory_.popitem(last=False)
+
+    def load(self, digest: str, key: str) -> Optional[str]:
+        if digest in self.memory_:
+            self.memory_.move_to_end(digest)
+            return self.memory_[digest]
+        if self.directory_ is None:
+            return None
+        try:
+            with open(self.path(digest)) as file:
+                entry = json.load(file)
+            # the modification time is the last use, the eviction goes by it
+            os.utime(self.path(digest))
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        self.remember(digest, entry['proof'])
+        return entry['proof']
+
+    def get(self, target: Expression) -> Optional[str]:
+        canonical = canonical_target(target)
+        if canonical is None:
+            return None
+        key, mapping = canonical
+        proof = self.load(hashlib.sha256(key.encode()).hexdigest(), key)
+        if proof is None:
+            self.misses_ += 1
+            return None
+        self.hits_ += 1
+        return rename(proof, {new: old for old, new in mapping.items()})
+
+    def put(self, target: Expression, proof: str):
+        canonical = canonical_target(target)
+        if canonical is None:
+            return
+        key, mapping = canonical
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        proof = rename(proof, mapping)
+        self.remember(digest, proof)
+        if self.directory_ is None:
+            return
+        with tempfile.NamedTemporaryFile('w', dir=self.directory_, delete=False, suffix='.tmp') as file:
+            json.dump({'key': key, 'proof': proof}, file, ensure_ascii=False)
+        os.replace(file.name, self.path(digest))
+        self.evict()
+
+    def evict(self):
+        # the least recently used files go first until the directory fits into max_bytes
+        entries = []
+        total = 0
+        with os.scandir(self.directory_) as scan:
+            for entry in scan:
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes_:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.memory_.pop(os.path.basename(path)[:-len('.json')], None)
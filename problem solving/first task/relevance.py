@@ -0,0 +1,73 @@
+import math
+from collections import Counter
+from typing import Dict, List, Tuple
+from constructor import Expression, Operation
+from library import LemmaLibrary, Derivation
+
+# the lemmas are schemata, so their only symbols are the connectives: a formula is described by its
+# connectives, negated leaves and the shapes of its subformulas one level deep (like "p>!p" or ">>*"),
+# weighted SInE-style by how rare the feature is in the library
+
+
+def shape(expression: Expression, idx: int) -> str:
+    term = expression[idx]
+    if term.type == 'Function':
+        return term.to_string()
+    return '!p' if term.op == Operation.NEGATION else 'p'
+
+
+def features(expression: Expression) -> Counter:
+    result = Counter()
+    if expression.empty():
+        return result
+    stack = [0]
+    while stack:
+        idx = stack.pop()
+        term = expression[idx]
+        if term.type != 'Function':
+            if term.op == Operation.NEGATION:
+                result['!'] += 1
+            continue
+        rel = expression.subtree(idx)
+        result[term.to_string()] += 1
+        result[shape(expression, rel.left()) + term.to_string() + shape(expression, rel.right())] += 1
+        stack.append(rel.left())
+        stack.append(rel.right())
+    return result
+
+
+class PremiseSelector:
+    def __init__(self, library: LemmaLibrary):
+        self.library_ = library
+        self.features_: Dict[str, Counter] = {}
+        frequency = Counter()
+        for key, lemma in library.lemmas_.items():
+            self.features_[key] = features(Expression(lemma['formula'].lower()))
+            frequency.update(self.features_[key].keys())
+        total = len(self.features_)
+        self.weights_ = {feature: math.log((1 + total) / (1 + count)) + 1 for feature, count in frequency.items()}
+
+    def vector(self, counts: Counter) -> Dict[str, float]:
+        return {feature: count * self.weights_.get(feature, 0.0) for feature, count in counts.items()}
+
+    def scores(self, goals: List[Expression]) -> Dict[str, float]:
+        # cosine similarity of the weighted features of a lemma and of all the goals together
+        goal = Counter()
+        for expression in goals:
+            goal.update(features(expression))
+        goal_vector = self.vector(goal)
+        goal_norm = math.sqrt(sum(value * value for value in goal_vector.values())) or 1.0
+        result = {}
+        for key, counts in self.features_.items():
+            vector = self.vector(counts)
+            norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+            dot = sum(value * goal_vector.get(feature, 0.0) for feature, value in vector.items())
+            result[key] = dot / (norm * goal_norm)
+        return result
+
+    def select(self, goals: List[Expression], limit: int) -> List[Tuple[str, Derivation]]:
+        scores = self.scores(goals)
+        lemmas = self.library_.lemmas_
+        ranked = sorted(lemmas, key=lambda key: (-scores[key], -lemmas[key]['used']))
+        return [(lemmas[key]['formula'], [(line[0], line[1]) for line in lemmas[key]['derivation']])
+                for key in ranked[:limit]]
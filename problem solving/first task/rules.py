@@ -0,0 +1,51 @@
+from typing import List, Tuple
+from constructor import Expression
+from modus_ponens import modus_ponens
+from matcher import matcher, detach
+from lemmas import Lemmas
+
+
+class DerivedRule:
+    def __init__(self, name: str, lemma: str, arity: int):
+        self.name = name
+        self.lemma_ = lemma
+        self.arity = arity
+
+    def schema(self) -> Expression:
+        proof, conclusion = Lemmas.get(self.lemma_)
+        return proof[conclusion]
+
+    def first(self, premise: Expression) -> Expression:
+        # the schema is fixed, so the first detachment uses its generated matcher
+        schema = self.schema()
+        return detach(premise, schema, matcher(schema))
+
+    def apply(self, premises: List[Expression]) -> Expression:
+        # the lemma is p1>(p2>...>c), so the rule is modus ponens with every premise in turn
+        current = self.first(premises[0])
+        for premise in premises[1:]:
+            if current.empty():
+                break
+            current = modus_ponens(premise, current)
+        return current
+
+    def expand(self, premises: List[Expression]) -> List[Tuple[str, List[str]]]:
+        proof, conclusion = Lemmas.get(self.lemma_)
+        lines = []
+        for idx in proof.ancestors(conclusion):
+            lines.append((proof[idx].to_string(), [proof[ref].to_string() for ref in proof.refs_[idx]]))
+        current = proof[conclusion]
+        for i, premise in enumerate(premises):
+            result = self.first(premise) if i == 0 else modus_ponens(premise, current)
+            lines.append((result.to_string(), [premise.to_string(), current.to_string()]))
+            current = result
+        return lines
+
+
+DERIVED_RULES = [
+    DerivedRule('syllogism', 'syllogism', 2),
+    DerivedRule('contraposition', 'contraposition', 1),
+    DerivedRule('conjunction_left', 'conjunction_left', 1),
+    DerivedRule('conjunction_right', 'conjunction_right', 1),
+    DerivedRule('conjunction', 'conjunction', 2),
+]
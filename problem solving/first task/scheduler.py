@@ -0,0 +1,53 @@
+import heapq
+import itertools
+from typing import Dict, List, Tuple
+from algorithm import Solver
+
+# many searches in one process: the solver with the smallest priority value takes the next slice of
+# `budget` units of work, solvers of equal priority take turns
+Slot = Tuple[int, int, int]
+
+
+class Scheduler:
+    def __init__(self, budget: int = 1000):
+        if budget <= 0:
+            raise ValueError(f"Invalid budget {budget}")
+        self.budget_ = budget
+        self.queue_: List[Slot] = []
+        self.solvers_: Dict[int, Solver] = {}
+        self.counter_ = itertools.count()
+
+    def __len__(self):
+        return len(self.solvers_)
+
+    def add(self, solver: Solver, priority: int = 0) -> int:
+        key = next(self.counter_)
+        self.solvers_[key] = solver
+        heapq.heappush(self.queue_, (priority, key, key))
+        return key
+
+    def cancel(self, key: int) -> bool:
+        # the search notices the stop in its next slice and finishes there
+        solver = self.solvers_.get(key)
+        if solver is None:
+            return False
+        solver.stop()
+        return True
+
+    def run_once(self) -> List[Tuple[int, Solver]]:
+        # one slice for the first solver in the queue, the finished ones are returned
+        if not self.queue_:
+            return []
+        priority, _, key = heapq.heappop(self.queue_)
+        solver = self.solvers_[key]
+        if solver.step(self.budget_):
+            del self.solvers_[key]
+            return [(key, solver)]
+        heapq.heappush(self.queue_, (priority, next(self.counter_), key))
+        return []
+
+    def run(self) -> List[Tuple[int, Solver]]:
+        finished = []
+        while self.queue_:
+            finished.extend(self.run_once())
+        return finished
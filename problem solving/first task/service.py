@@ -0,0 +1,189 @@
+import asyncio
+import json
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Set, Tuple, Optional
+from constructor import Expression
+from algorithm import Solver
+from rules import DERIVED_RULES
+from lemmas import Lemmas
+from main import AXIOMS
+from proof_cache import ProofCache
+from checker import ProofChecker
+
+# one request or reply per line, as JSON:
+#   {"id": 1, "target": "a>a", "time_limit_ms": 1000} -> {"id": 1, "proved": true, "proof": "..."}
+#   {"cancel": 1}                                     -> {"id": 1, "cancelled": true}
+DEFAULT_TIME_LIMIT_MS = 10000
+MAX_TIME_LIMIT_MS = 60000
+
+
+def invalid(request: dict) -> Optional[str]:
+    # why a request can not be answered, or None; the id is echoed back, so it must be a plain value
+    if not isinstance(request.get('id'), (int, str, type(None))):
+        return "the id must be a number or a string"
+    if 'cancel' in request:
+        return None if isinstance(request['cancel'], (int, str)) else "cancel needs the id of a request"
+    if not isinstance(request.get('target'), str):
+        return "the request has no target"
+    time_limit = request.get('time_limit_ms', DEFAULT_TIME_LIMIT_MS)
+    if not isinstance(time_limit, int) or isinstance(time_limit, bool) or time_limit <= 0:
+        return "time_limit_ms must be a positive integer"
+    return None
+
+
+class ProofService:
+    def __init__(self, workers: int = 4, max_time_limit_ms: int = MAX_TIME_LIMIT_MS,
+                 cache: Optional[ProofCache] = None):
+        # everything that does not depend on the target is prepared once and kept for all requests
+        self.axioms_ = [Expression(axiom) for axiom in AXIOMS]
+        Lemmas.build()
+        self.max_time_limit_ = max_time_limit_ms
+        self.executor_ = ThreadPoolExecutor(max_workers=workers)
+        # the proofs found so far, for every renaming of the constants of their targets
+        self.answers_ = cache if cache is not None else ProofCache()
+        self.checker_ = ProofChecker()
+        self.running_: Dict[object, Solver] = {}
+        self.cancelled_: Set[object] = set()
+
+    def prove(self, solver: Solver, key: object) -> Tuple[bool, str]:
+        # a request cancelled while it was waiting for a worker is not started at all
+        try:
+            if key in self.cancelled_:
+                solver.dump_.close()
+            else:
+                solver.solve()
+        finally:
+            self.running_.pop(key, None)
+        return solver.proved_, solver.thought_chain()
+
+    async def answer(self, request: dict, key: object) -> dict:
+        reply = {'id': request.get('id')}
+        try:
+            target = Expression(request['target'])
+        except (RuntimeError, IndexError) as error:
+            return {**reply, 'error': f"invalid target: {error}"}
+        target.standardize()
+        target.make_permanent()
+        proof = self.answers_.get(target)
+        if proof is not None:
+            return {**reply, 'proved': True, 'proof': proof}
+        time_limit = min(request.get('time_limit_ms', DEFAULT_TIME_LIMIT_MS), self.max_time_limit_)
+        # the request can be cancelled from the moment it is queued
+        solver = Solver([Expression(axiom) for axiom in self.axioms_], target, time_limit, DERIVED_RULES)
+        self.running_[key] = solver
+        loop = asyncio.get_running_loop()
+        proved, proof = await loop.run_in_executor(self.executor_, self.prove, solver, key)
+        if key in self.cancelled_:
+            self.cancelled_.discard(key)
+            return {**reply, 'cancelled': True}
+        # a proof that ran out of budget may be found with a larger one, only checked proofs are kept
+        if proved and self.checker_.check(proof, str(target))[0]:
+            self.answers_.put(target, proof)
+        return {**reply, 'proved': proved, 'proof': proof}
+
+    def cancel(self, key: object) -> bool:
+        solver = self.running_.get(key)
+        if solver is None:
+            return False
+        self.cancelled_.add(key)
+        solver.stop()
+        return True
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        pending = set()
+        lock = asyncio.Lock()
+
+        async def send(reply: dict):
+            async with lock:
+                writer.write((json.dumps(reply, ensure_ascii=False) + '\n').encode())
+                await writer.drain()
+
+        async def serve(request: dict, key: object):
+            await send(await self.answer(request, key))
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as error:
+                    await send({'error': f"invalid request: {error}"})
+                    continue
+                if not isinstance(request, dict):
+                    await send({'error': "invalid request: not a JSON object"})
+                    continue
+                error = invalid(request)
+                if error is not None:
+                    await send({'id': request.get('id') if isinstance(request.get('id'), (int, str)) else None,
+                                'error': error})
+                    continue
+                if 'cancel' in request:
+                    if not self.cancel((id(writer), request['cancel'])):
+                        await send({'id': request['cancel'], 'error': "no such running request"})
+                    continue
+                task = asyncio.create_task(serve(request, (id(writer), request.get('id'))))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            # a client that went away does not need its answers any more
+            for key in list(self.running_):
+                if key[0] == id(writer):
+                    self.cancel(key)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765, path: Optional[str] = None):
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path=path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            print(f"serving on {path or f'{host}:{port}'}", file=sys.stderr)
+            await server.serve_forever()
+
+    def close(self):
+        for key in list(self.running_):
+            self.cancel(key)
+        self.executor_.shutdown(wait=True)
+
+
+async def request(target: str, time_limit_ms: int = DEFAULT_TIME_LIMIT_MS,
+                  host: str = '127.0.0.1', port: int = 8765, path: Optional[str] = None) -> dict:
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps({'id': 0, 'target': target, 'time_limit_ms': time_limit_ms}) + '\n').encode())
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return reply
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keeps the prover warm and answers proof requests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--cache', help="directory of the proof cache shared between runs")
+    parser.add_argument('--cache-size', type=int, default=64 << 20, help="bytes the proof cache may take on disk")
+    args = parser.parse_args()
+    service = ProofService(args.workers, cache=ProofCache(args.cache, args.cache_size))
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
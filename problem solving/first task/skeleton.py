@@ -0,0 +1,122 @@
+from typing import Dict, Iterator, List, Tuple
+from constructor import Expression, Term, Operation
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# the top levels of every formula as a row of codes in heap order (the children of position p are 2p + 1
+# and 2p + 2): an operation, a constant with its polarity, or a wildcard for variables and missing nodes.
+# Unification is structural, so two formulas whose rows differ where neither has a wildcard never unify
+AVAILABLE = np is not None
+WILDCARD = 0
+FUNCTION, CONSTANT = 1, 2
+
+
+def code(term: Term) -> int:
+    if term.type == 'Variable':
+        return WILDCARD
+    kind = FUNCTION if term.type == 'Function' else CONSTANT
+    return term.value << 8 | term.op.value << 2 | kind
+
+
+def skeleton(expression: Expression, idx: int, width: int) -> List[int]:
+    row = [WILDCARD] * width
+    stack = [(idx, 0)]
+    while stack:
+        node, pos = stack.pop()
+        term = expression[node]
+        row[pos] = code(term)
+        if term.type == 'Function' and 2 * pos + 2 < width:
+            rel = expression.subtree(node)
+            stack.append((rel.left(), 2 * pos + 1))
+            stack.append((rel.right(), 2 * pos + 2))
+    return row
+
+
+class SkeletonIndex:
+    # the skeletons of the active formulas and of their antecedents, one row per formula: a demoted formula
+    # gives its row to the last one, so there are as many rows as active formulas
+    def __init__(self, depth: int = 3, capacity: int = 1024):
+        if not AVAILABLE:
+            raise ImportError("SkeletonIndex needs numpy")
+        if depth < 1:
+            raise ValueError("The skeleton depth must be positive")
+        self.width_ = (1 << depth) - 1
+        self.size_ = 0
+        self.formulas_ = np.zeros((capacity, self.width_), dtype=np.int64)
+        self.antecedents_ = np.zeros((capacity, self.width_), dtype=np.int64)
+        self.implications_ = np.zeros(capacity, dtype=bool)
+        # the formula of every row and the row of every formula
+        self.ids_ = np.zeros(capacity, dtype=np.int64)
+        self.rows_: Dict[int, int] = {}
+
+    def __len__(self):
+        return self.size_
+
+    def __contains__(self, idx: int):
+        return idx in self.rows_
+
+    def grow(self):
+        capacity = 2 * len(self.implications_)
+        self.formulas_ = np.resize(self.formulas_, (capacity, self.width_))
+        self.antecedents_ = np.resize(self.antecedents_, (capacity, self.width_))
+        self.implications_ = np.resize(self.implications_, capacity)
+        self.ids_ = np.resize(self.ids_, capacity)
+
+    def append(self, idx: int, expression: Expression):
+        if self.size_ == len(self.implications_):
+            self.grow()
+        row = self.size_
+        self.size_ += 1
+        self.rows_[idx] = row
+        self.ids_[row] = idx
+        self.formulas_[row] = WILDCARD
+        self.antecedents_[row] = WILDCARD
+        self.implications_[row] = False
+        # an empty formula is never a major premise and modus ponens rejects it as a minor one
+        if expression.empty():
+            return
+        self.formulas_[row] = skeleton(expression, 0, self.width_)
+        if expression[0].type == 'Function' and expression[0].op == Operation.IMPLICATION:
+            self.implications_[row] = True
+            self.antecedents_[row] = skeleton(expression, expression.subtree(0).left(), self.width_)
+
+    def remove(self, idx: int):
+        row = self.rows_.pop(idx)
+        last = self.size_ - 1
+        if row != last:
+            self.formulas_[row] = self.formulas_[last]
+            self.antecedents_[row] = self.antecedents_[last]
+            self.implications_[row] = self.implications_[last]
+            self.ids_[row] = self.ids_[last]
+            self.rows_[int(self.ids_[row])] = row
+        self.size_ = last
+
+    def clear(self):
+        self.size_ = 0
+        self.rows_.clear()
+
+    @staticmethod
+    def compatible(rows, row):
+        return ((rows == row) | (rows == WILDCARD) | (row == WILDCARD)).all(axis=1)
+
+    def partners(self, newest: int) -> Tuple[Iterator[Tuple[int, bool, bool]], int]:
+        # the formulas j <= newest that may be the minor premise (newest is the major) or the major premise
+        # (newest is the minor) of modus ponens with the newest formula, in the order of the formulas, and
+        # the number of pairs rejected without unification
+        count = self.size_
+        row = self.rows_[newest]
+        earlier = self.ids_[:count] <= newest
+        if self.implications_[row]:
+            minors = earlier & self.compatible(self.formulas_[:count], self.antecedents_[row])
+        else:
+            minors = np.zeros(count, dtype=bool)
+        majors = earlier & self.implications_[:count] & \
+            self.compatible(self.antecedents_[:count], self.formulas_[row])
+        majors[row] = False
+        rejected = 2 * int(earlier.sum()) - 1 - int(minors.sum()) - int(majors.sum())
+        survivors = np.flatnonzero(minors | majors)
+        survivors = survivors[np.argsort(self.ids_[survivors], kind='stable')]
+        return zip(self.ids_[survivors].tolist(), minors[survivors].tolist(), majors[survivors].tolist()), rejected
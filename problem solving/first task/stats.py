@@ -0,0 +1,66 @@
+import sys
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# a hook gets the event name and its data: 'phase', 'generation' and 'finished'
+Hook = Callable[[str, dict], None]
+
+
+class SearchStats:
+    def __init__(self, dump_path: Optional[str] = None, hooks: List[Hook] = ()):
+        self.counters_: Counter = Counter()
+        self.timers_: Dict[str, float] = {}
+        self.generations_: List[dict] = []
+        self.summary_: dict = {}
+        self.hooks_: List[Hook] = list(hooks)
+        self.dump_path_ = dump_path
+
+    def subscribe(self, hook: Hook):
+        self.hooks_.append(hook)
+
+    def emit(self, event: str, data: dict):
+        for hook in self.hooks_:
+            hook(event, data)
+
+    def count(self, name: str, value: int = 1):
+        self.counters_[name] += value
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timers_[name] = self.timers_.get(name, 0.0) + elapsed
+            self.emit('phase', {'phase': name, 'seconds': elapsed})
+
+    def generation(self, record: dict):
+        record = {'generation': len(self.generations_) + 1, **record}
+        self.generations_.append(record)
+        self.emit('generation', record)
+
+    def to_dict(self) -> dict:
+        return {
+            'summary': self.summary_,
+            'counters': dict(sorted(self.counters_.items())),
+            'phases': self.timers_,
+            'generations': self.generations_,
+        }
+
+    def finish(self, summary: dict):
+        self.summary_ = summary
+        if self.dump_path_ is not None:
+            with open(self.dump_path_, 'w') as file:
+                json.dump(self.to_dict(), file, indent=2, ensure_ascii=False)
+                file.write('\n')
+        self.emit('finished', self.to_dict())
+
+
+def progress(event: str, data: dict):
+    # the old stderr report of the search, as a hook
+    if event == 'generation':
+        print(f"iter: {data['size']}, newly produced: {data['produced']}, {data['seconds']:.3f}s", file=sys.stderr)
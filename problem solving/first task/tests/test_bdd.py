@@ -0,0 +1,58 @@
+import pytest
+from constructor import Expression, Operation
+from bdd import BDD, TRUE, falsify, is_tautology
+
+OPERATIONS = {
+    Operation.IMPLICATION: lambda left, right: not left or right,
+    Operation.CONJUNCTION: lambda left, right: left and right,
+    Operation.DISJUNCTION: lambda left, right: left or right,
+    Operation.XOR: lambda left, right: left != right,
+    Operation.EQUIVALENT: lambda left, right: left == right,
+}
+TAUTOLOGIES = ["a>a", "((a>b)>a)>a", "(a>b)>(!b>!a)", "(a*b)>(b*a)", "(a+b)>!(a=b)", "!!a>a"]
+FALSIFIABLE = ["a>b", "(a>b)>a", "!a>(a*b)", "(a+b)>(a|b)>(a*b)", "a=!b", "((a>b)>c)>(c>a)"]
+
+
+def evaluate(expression: Expression, valuation: dict, default: bool, idx: int = 0) -> bool:
+    term = expression[idx]
+    if term.type != 'Function':
+        value = valuation.get((term.type, term.value), default)
+        return not value if term.op == Operation.NEGATION else value
+    rel = expression.subtree(idx)
+    left = evaluate(expression, valuation, default, rel.left())
+    right = evaluate(expression, valuation, default, rel.right())
+    return OPERATIONS[term.op](left, right)
+
+
+def formula(text: str) -> Expression:
+    expression = Expression(text)
+    expression.standardize()
+    return expression
+
+
+@pytest.mark.parametrize("text", TAUTOLOGIES)
+def test_tautology_is_not_falsified(text):
+    assert is_tautology(formula(text))
+    assert falsify(formula(text)) is None
+
+
+@pytest.mark.parametrize("text", FALSIFIABLE)
+def test_valuation_falsifies(text):
+    expression = formula(text)
+    valuation = falsify(expression)
+    assert valuation is not None
+    # the leaves the valuation leaves out may take any value
+    assert not evaluate(expression, valuation, False)
+    assert not evaluate(expression, valuation, True)
+
+
+def test_falsify_constants():
+    expression = Expression("a>b")
+    expression.make_permanent()
+    assert falsify(expression) == {('Constant', 1): True, ('Constant', 2): False}
+
+
+def test_falsify_true_node():
+    bdd = BDD()
+    assert bdd.falsify(TRUE) is None
+    assert bdd.falsify(bdd.from_expression(formula("a*!a"))) == {}
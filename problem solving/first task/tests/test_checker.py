@@ -0,0 +1,83 @@
+from checker import ProofChecker
+
+IDENTITY = """1. step(): A>((B>A)>A)
+2. step(): (A>((B>A)>A))>((A>(B>A))>(A>A))
+3. step(1,2): (A>(B>A))>(A>A)
+4. step(): A>(B>A)
+5. step(4,3): A>A
+"""
+
+
+def test_valid_proof():
+    assert ProofChecker().check(IDENTITY, "A>A") == (True, "5 steps verified")
+
+
+def test_invalid_step():
+    ok, message = ProofChecker().check(IDENTITY.replace("5. step(4,3): A>A", "5. step(4,3): A>B"))
+    assert not ok and message.startswith("step 5")
+
+
+def test_proof_of_another_formula():
+    ok, message = ProofChecker().check("1. step(): A>(B>A)\n", "a>b")
+    assert not ok and "not the goal" in message
+
+
+def test_hypothesis_without_the_goal():
+    text = "deduction theorem: Γ ⊢ a>b <=> Γ U {a} ⊢ b\n1. step(): a\n"
+    ok, message = ProofChecker().check(text, "a>b")
+    assert not ok and "not the goal" in message
+
+
+def test_hypothesis_proves_its_goal():
+    text = "deduction theorem: Γ ⊢ a>a <=> Γ U {a} ⊢ a\n1. step(): a\n"
+    assert ProofChecker().check(text, "a>a")[0]
+
+
+def test_deduction_of_another_target():
+    text = "deduction theorem: Γ ⊢ b>b <=> Γ U {b} ⊢ b\n1. step(): b\n"
+    ok, message = ProofChecker().check(text, "a>a")
+    assert not ok and "not the current goal" in message
+
+
+def test_deduction_that_is_not_an_implication():
+    text = "deduction theorem: Γ ⊢ a>b <=> Γ U {b} ⊢ b\n1. step(): b\n"
+    ok, message = ProofChecker().check(text, "a>b")
+    assert not ok and "is not b>b" in message
+
+
+def test_hypothesis_of_a_later_goal():
+    # a is only a hypothesis for the goal b, it can not prove the target itself
+    text = "deduction theorem: Γ ⊢ a>b <=> Γ U {a} ⊢ b\n1. step(): a\n"
+    assert not ProofChecker().check(text, "a")[0]
+
+
+def test_change_of_variables():
+    text = IDENTITY + "change variables: A>A\nA -> b*c\nproved: b*c>b*c\n"
+    assert ProofChecker().check(text, "b*c>b*c")[0]
+
+
+def test_wrong_change_of_variables():
+    text = IDENTITY + "change variables: A>A\nA -> b\nproved: b>b\n"
+    ok, message = ProofChecker().check(text, "b>c")
+    assert not ok and "not the goal" in message
+
+
+def test_change_of_variables_of_another_step():
+    text = IDENTITY + "change variables: A>(B>A)\nA -> b\nproved: b>(B>b)\n"
+    ok, message = ProofChecker().check(text)
+    assert not ok and "not the last step" in message
+
+
+def test_proved_line_must_follow():
+    text = IDENTITY + "change variables: A>A\nA -> b\nproved: c>c\n"
+    ok, message = ProofChecker().check(text)
+    assert not ok and message.startswith("proved")
+
+
+def test_no_steps():
+    assert ProofChecker().check("The expression is not a tautology\n", "a") == (False, "no proof steps")
+
+
+def test_check_many_with_targets():
+    results = ProofChecker().check_many([IDENTITY, IDENTITY], ["A>A", "A>B"])
+    assert [ok for ok, _ in results] == [True, False]
@@ -0,0 +1,61 @@
+import pytest
+from constructor import Expression
+from codec import MAGIC, VERSION, encode, decode, encode_many, decode_many
+
+
+def terms(expression: Expression) -> list:
+    return [(expression[i].type, expression[i].value, expression[i].op) for i in range(len(expression))]
+
+
+def renamed(text: str, shift: int) -> Expression:
+    expression = Expression(text)
+    for i in range(len(expression)):
+        if expression[i].type == 'Variable':
+            expression[i].value += shift
+    return expression
+
+
+def test_round_trip():
+    target = Expression("(a>!b)>((a*c)+!(b|c))")
+    target.standardize()
+    constants = Expression("a>(b=!a)")
+    constants.make_permanent()
+    for expression in [Expression("a>(b>a)"), Expression("!a"), target, constants]:
+        assert terms(decode(encode(expression))) == terms(expression)
+
+
+def test_round_trip_of_many():
+    expressions = [Expression("a>a"), Expression("(a>b)>c"), Expression("!a>!b")]
+    assert [terms(expression) for expression in decode_many(encode_many(expressions))] == \
+        [terms(expression) for expression in expressions]
+
+
+def test_variables_above_the_alphabet():
+    expression = renamed("a>(b>!c)", 1000)
+    result = decode(encode(expression))
+    assert terms(result) == terms(expression)
+    assert result.max_value() == 1003
+
+
+def test_truncated_input():
+    data = encode(Expression("(a>b)>(!b>!a)"))
+    for size in range(len(data)):
+        with pytest.raises(ValueError):
+            decode(data[:size])
+
+
+def test_trailing_bytes():
+    with pytest.raises(ValueError):
+        decode(encode(Expression("a>a")) + b'\0')
+
+
+def test_bad_version():
+    data = bytearray(encode(Expression("a>a")))
+    data[len(MAGIC)] = VERSION + 1
+    with pytest.raises(ValueError, match="version"):
+        decode(data)
+
+
+def test_bad_magic():
+    with pytest.raises(ValueError, match="Not an encoded expression"):
+        decode(b'XX' + encode(Expression("a>a"))[len(MAGIC):])
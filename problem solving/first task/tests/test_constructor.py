@@ -0,0 +1,22 @@
+from constructor import Expression
+
+
+def canonical(text: str) -> str:
+    expression = Expression(text)
+    expression.canonicalize()
+    return expression.to_string()
+
+
+def test_canonicalize_ignores_operand_order():
+    assert canonical("(b*a)>a") == canonical("(a*b)>a")
+    assert canonical("(a+b)=c") == canonical("c=(b+a)")
+
+
+def test_canonicalize_ignores_variable_names():
+    assert canonical("(b*a)>a") == canonical("(a*b)>b")
+    assert canonical("(a*b)*(b*c)") == canonical("(c*b)*(b*a)") == canonical("(b*c)*(a*b)")
+
+
+def test_canonicalize_keeps_distinct_formulas_apart():
+    assert canonical("(a*b)>a") != canonical("(a*b)>c")
+    assert canonical("a>(b>a)") != canonical("b>(b>a)")
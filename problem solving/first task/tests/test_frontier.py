@@ -0,0 +1,66 @@
+import pytest
+from constructor import Expression
+from frontier import SpillingFrontier
+
+FORMULAS = ["a>a", "a>(b>a)", "!a>b", "(a>b)>((b>c)>(a>c))"]
+
+
+def entries(count: int) -> list:
+    # formulas and lazy pairs in turn, compared by their text
+    return [Expression(FORMULAS[i % len(FORMULAS)]) if i % 2 else (i, i + 1, i + 2) for i in range(count)]
+
+
+def text(entry) -> str:
+    return entry.to_string() if isinstance(entry, Expression) else str(entry)
+
+
+def test_spill_and_refill_keep_the_order():
+    frontier = SpillingFrontier(limit=3, chunk=2)
+    expected = entries(20)
+    frontier.extend(expected)
+    assert frontier.spilled_ > 0
+    assert len(frontier) == len(expected)
+    assert [text(entry) for entry in frontier] == [text(entry) for entry in expected]
+    assert [text(frontier.popleft()) for _ in range(len(expected))] == [text(entry) for entry in expected]
+    assert not frontier
+
+
+def test_appends_while_popping():
+    frontier = SpillingFrontier(limit=2, chunk=2)
+    expected = entries(30)
+    popped = []
+    for i, entry in enumerate(expected):
+        frontier.append(entry)
+        if i % 3 == 2:
+            popped.append(frontier.popleft())
+    while frontier:
+        popped.append(frontier.popleft())
+    assert [text(entry) for entry in popped] == [text(entry) for entry in expected]
+
+
+def test_refill_after_the_file_is_drained():
+    frontier = SpillingFrontier(limit=2, chunk=2)
+    frontier.extend(entries(8))
+    for _ in range(8):
+        frontier.popleft()
+    assert frontier.spilled_ == 0
+    frontier.extend(entries(5))
+    assert [text(frontier.popleft()) for _ in range(5)] == [text(entry) for entry in entries(5)]
+
+
+def test_pop_from_empty():
+    with pytest.raises(IndexError):
+        SpillingFrontier(limit=2).popleft()
+
+
+def test_solver_closes_its_frontier():
+    from algorithm import Solver
+    from main import AXIOMS
+    from rules import DERIVED_RULES
+    target = Expression("a>a")
+    target.standardize()
+    target.make_permanent()
+    solver = Solver([Expression(axiom) for axiom in AXIOMS], target, 2000, DERIVED_RULES, memory_limit=100)
+    solver.solve()
+    assert solver.proved_
+    assert solver.produced_.file_.closed
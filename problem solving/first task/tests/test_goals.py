@@ -0,0 +1,49 @@
+from constructor import Expression
+from goals import GoalIndex, match
+
+
+def goal(text: str) -> Expression:
+    # the targets of the solver are made of constants
+    expression = Expression(text)
+    expression.make_permanent()
+    return expression
+
+
+def texts(binding) -> dict:
+    return {value: subterm.to_string() for value, subterm in binding.items()}
+
+
+def test_negated_variable_binds_the_negation():
+    assert texts(match(Expression("!a>b"), goal("c>d"))) == {1: "!c", 2: "d"}
+    assert texts(match(Expression("!a>b"), goal("!c>d"))) == {1: "c", 2: "d"}
+
+
+def test_negated_and_plain_occurrences_agree():
+    assert texts(match(Expression("!a>a"), goal("c>!c"))) == {1: "!c"}
+    assert match(Expression("!a>a"), goal("c>c")) is None
+
+
+def test_negated_variable_over_a_subterm():
+    assert texts(match(Expression("!a"), goal("c*d"))) == {1: "c>!d"}
+    assert match(Expression("!a>(b>!a)"), goal("(c*d)>(e>(c>!d))")) is None
+
+
+def test_index_matches_through_negated_variables():
+    index = GoalIndex()
+    index.add(goal("c>d"))
+    index.add(goal("!c>(d>!c)"))
+    index.add(goal("(c>d)>!(c>d)"))
+    idx, binding = index.match(Expression("!a>(b>!a)"))
+    assert idx == 1 and texts(binding) == {1: "c", 2: "d"}
+    idx, binding = index.match(Expression("!a>a"))
+    assert idx == 2 and texts(binding) == {1: "c*!d"}
+    idx, binding = index.match(Expression("!a>b"))
+    assert idx == 0 and texts(binding) == {1: "!c", 2: "d"}
+
+
+def test_index_rejects_formulas_without_instances():
+    index = GoalIndex()
+    index.add(goal("c>!c"))
+    assert index.match(Expression("!a>!a")) is None
+    assert index.match(Expression("a*b")) is None
+    assert index.match(Expression("(a>b)>(c>(d>e))")) is None
@@ -0,0 +1,61 @@
+from typing import Callable, Dict, List, Tuple
+
+Expansion = Callable[[str], List[Tuple[str, List[str]]]]
+
+
+class TopoSort:
+    def __init__(self, conclusions: Dict[str, List[str]], target: str, expand: Expansion = None):
+        self.conclusions_ = conclusions
+        self.expand_ = expand
+        self.order_: List[str] = []
+        self.index_: Dict[str, int] = {}
+        self.sort(target)
+
+    def premises(self, expression: str) -> List[str]:
+        parts = self.conclusions_.get(expression, [])
+        if not parts or parts[0] == 'axiom':
+            return []
+        return parts[1:]
+
+    def is_macro(self, expression: str) -> bool:
+        parts = self.conclusions_.get(expression, [])
+        return bool(parts) and parts[0] not in {'axiom', 'mp'}
+
+    def sort(self, target: str):
+        visited = set()
+        stack = [(target, False)]
+        while stack:
+            expression, expanded = stack.pop()
+            if expanded:
+                if expression not in self.index_:
+                    self.order_.append(expression)
+                    self.index_[expression] = len(self.order_)
+                continue
+            if expression in visited:
+                continue
+            visited.add(expression)
+            stack.append((expression, True))
+            for premise in reversed(self.premises(expression)):
+                if premise not in visited:
+                    stack.append((premise, False))
+
+    def lines(self) -> List[Tuple[str, List[str]]]:
+        # derived rules are expanded into their modus ponens chains only here
+        result = []
+        for expression in self.order_:
+            if self.is_macro(expression) and self.expand_ is not None:
+                result.extend(self.expand_(expression))
+            else:
+                result.append((expression, self.premises(expression)))
+        return result
+
+    def to_string(self) -> str:
+        out = []
+        numbers = {}
+        for expression, premises in self.lines():
+            if expression in numbers:
+                continue
+            numbers[expression] = len(numbers) + 1
+            refs = ','.join(str(numbers[premise]) for premise in premises)
+            out.append(f"{numbers[expression]}. step({refs}): {expression}\n")
+        return ''.join(out)